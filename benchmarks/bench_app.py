@@ -0,0 +1,55 @@
+"""
+Measures the cost of LXMFApp._response_wrapper with many registered paths and open links.
+
+RNS and LXMF are stubbed (see stubs.py), so this is the in-process cost only: link
+lookup, path matching, argument binding and the handler call.
+
+    python benchmarks/bench_app.py
+"""
+import time
+from stubs import stub_app, StubLink
+
+PATHS = 1000
+PATTERNS = 100
+LINKS = 10000
+
+def measure(fn, rounds:int, repeat:int=5) -> float:
+    """
+    Returns the mean time per call in nanoseconds, from the fastest of repeat runs.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(rounds):
+            fn()
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / rounds
+
+def run(rounds:int=20000) -> dict:
+    with stub_app() as app:
+        for i in range(PATHS):
+            app.request_handler(f"/page/static/{i}.mu")(lambda: b"Hello World!")
+        for i in range(PATTERNS):
+            app.request_handler(f"/page/section{i}/{{id}}.mu")(lambda path_vars: path_vars["id"].encode("utf-8"))
+        app.request_handler("/page/cached.mu", cache_ttl=3600)(lambda params: b"Cached!")
+
+        for i in range(LINKS):
+            link = StubLink(i.to_bytes(16, "big"))
+            app.links[link.link_id] = link
+        link_id = (LINKS // 2).to_bytes(16, "big")
+        unknown_link = (LINKS + 1).to_bytes(16, "big")
+
+        data = {"var_name": "Anonymous", "var_page": "2"}
+        respond = app._response_wrapper
+        return {
+            "exact_ns": measure(lambda: respond("/page/static/500.mu", data, b"request", link_id, None, 0.0), rounds),
+            "pattern_ns": measure(lambda: respond("/page/section50", {"var_route": "42.mu"}, b"request", link_id, None, 0.0), rounds),
+            "cached_ns": measure(lambda: respond("/page/cached.mu", data, b"request", link_id, None, 0.0), rounds),
+            "not_found_ns": measure(lambda: respond("/page/section50", {"var_route": "a/b/c"}, b"request", link_id, None, 0.0), rounds // 10),
+            "unknown_link_ns": measure(lambda: respond("/page/static/500.mu", data, b"request", unknown_link, None, 0.0), rounds // 10),
+        }
+
+if __name__ == "__main__":
+    for name, ns in run().items():
+        print(f"{name:>16}: {ns:8.0f} ns/request")
@@ -0,0 +1,67 @@
+"""
+Microbenchmark comparing per-request handler dispatch cost.
+
+"legacy" reproduces the old behaviour of calling inspect.signature on every request,
+"compiled" uses the RequestHandler binder that is built once at registration time.
+
+    python benchmarks/bench_dispatch.py
+"""
+import os, sys, time, inspect
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from LXMKit.app import RequestHandler
+
+def resolve_params(data):
+    if data is None:
+        return {}
+    return dict([(k[4:], v) for (k, v) in data.items()])
+
+def legacy_dispatch(target_func, path, data, request_id, found_link, remote_identity, requested_at):
+    params = inspect.signature(target_func).parameters
+
+    kwargs = {}
+    if 'params' in params:
+        kwargs['params'] = resolve_params(data)
+    if 'path' in params:
+        kwargs['path'] = path
+    if 'link' in params or 'found_link' in params:
+        kwargs['link' if 'link' in params else 'found_link'] = found_link
+    if 'data' in params:
+        kwargs['data'] = data
+    if 'request_id' in params:
+        kwargs['request_id'] = request_id
+    if 'remote_identity' in params:
+        kwargs['remote_identity'] = remote_identity
+    if 'requested_at' in params:
+        kwargs['requested_at'] = requested_at
+
+    return target_func(**kwargs)
+
+def handler(path, link, params):
+    return b"Hello World!"
+
+REQUEST = ("/page/index.mu", {"var_name": "Anonymous", "var_page": "2"}, b"request", object(), None, 0.0)
+
+def measure(fn, rounds:int) -> float:
+    """
+    Returns the mean time per call in nanoseconds.
+    """
+    start = time.perf_counter_ns()
+    for _ in range(rounds):
+        fn(*REQUEST)
+    return (time.perf_counter_ns() - start) / rounds
+
+def run(rounds:int=100000) -> dict:
+    compiled = RequestHandler(handler, resolve_params)
+    results = {
+        "legacy_ns": measure(lambda *args: legacy_dispatch(handler, *args), rounds),
+        "compiled_ns": measure(compiled, rounds),
+    }
+    return results
+
+if __name__ == "__main__":
+    results = run()
+    for name, ns in results.items():
+        print(f"{name:>10}: {ns:8.0f} ns/request")
+    print(f"{'speedup':>10}: {results['legacy_ns'] / results['compiled_ns']:8.1f}x")
@@ -0,0 +1,42 @@
+"""
+Measures the cost of building a Message (and its Author) for each inbound LXMF message.
+
+    python benchmarks/bench_message.py
+"""
+import time
+import RNS
+from stubs import stub_app, StubMessage
+from LXMKit.app import Author, Message
+
+def measure(fn, rounds:int, repeat:int=5) -> float:
+    """
+    Returns the mean time per call in nanoseconds, from the fastest of repeat runs.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(rounds):
+            fn()
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / rounds
+
+def run(rounds:int=2000) -> dict:
+    with stub_app() as app:
+        # A peer that has announced, so its identity can be recalled and a destination built
+        peer = RNS.Identity()
+        peer_hash = RNS.Destination.hash(peer, "lxmf", "delivery")
+        RNS.Identity.remember(RNS.Identity.get_random_hash(), peer_hash, peer.get_public_key())
+        stranger_hash = RNS.Identity.get_random_hash()
+
+        lxmessage = StubMessage(peer_hash)
+        return {
+            "author_unknown_ns": measure(lambda: Author(stranger_hash, app.router, app.source, app.get_display_name), rounds),
+            "author_known_ns": measure(lambda: Author(peer_hash, app.router, app.source, app.get_display_name), rounds),
+            "message_ns": measure(lambda: Message(lxmessage, app.router, app.source, app.get_display_name), rounds),
+            "message_cached_author_ns": measure(lambda: Message(lxmessage, app.router, app.source, app.get_display_name, app.get_author(peer_hash)), rounds),
+        }
+
+if __name__ == "__main__":
+    for name, ns in run().items():
+        print(f"{name:>26}: {ns:8.0f} ns")
@@ -0,0 +1,68 @@
+"""
+Measures announce ingestion and display name lookups on the LMDB names store.
+
+    python benchmarks/bench_names.py
+"""
+import os, sys, time, tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from RNS.vendor import umsgpack
+from LXMKit.names import NameStore
+
+def app_data(i:int) -> bytes:
+    return umsgpack.packb([f"Peer {i}".encode("utf-8"), None])
+
+def best(fn, repeat:int=5) -> float:
+    """
+    Returns the fastest of repeat timed calls, in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def run(announces:int=20000) -> dict:
+    keys = [i.to_bytes(16, "big") for i in range(announces)]
+    values = [app_data(i) for i in range(announces)]
+
+    with tempfile.TemporaryDirectory() as path:
+        # Flushing is driven by batch_size alone here, not by the background timer
+        store = NameStore(path, flush_interval=3600)
+        try:
+            start = time.perf_counter()
+            for (key, value) in zip(keys, values):
+                store.put(key, value)
+            store.flush()
+            ingest = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for (key, value) in zip(keys, values):
+                store.put(key, value)
+            repeat = time.perf_counter() - start
+
+            lookup = best(lambda: [store.get(key) for key in keys])
+
+            # Hot peers, few enough to stay in the decoded name cache
+            hot = keys[:1000] * (announces // 1000)
+            for key in hot:
+                store.display_name(key)
+            cached = best(lambda: [store.display_name(key) for key in hot])
+
+            commits = store.commits
+        finally:
+            store.close()
+
+    return {
+        "ingest_per_s": announces / ingest,
+        "reannounce_per_s": announces / repeat,
+        "lookup_per_s": announces / lookup,
+        "display_name_per_s": len(hot) / cached,
+        "commits": commits,
+    }
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:>20}: {value:12.0f}")
@@ -0,0 +1,88 @@
+"""
+Measures micron render time and the memory held by element trees.
+
+    python benchmarks/bench_render.py
+"""
+import os, sys, time, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from LXMKit.mu import *
+
+ROW_STYLE = [FOREGROUND_LIGHT_GREY, BOLD]
+
+def small_tree() -> Micron:
+    return Micron([
+        Header("Login Form Example", [
+            Div([
+                Br(),
+                Span([Paragraph("Username: "), Input("name", "Anonymous", 16, style=[BACKGROUND_DARK_GREY])]),
+                Span([Paragraph("Password: "), Input("pass", "password123", 16, style=[BACKGROUND_DARK_GREY])]),
+                Br(),
+                Anchor("   Submit   ", href=None, style=[BACKGROUND_DARK_GREY]),
+                Br(),
+            ], style=[BACKGROUND_DARKER_GREY, CENTER])
+        ])
+    ])
+
+def table_tree(rows:int) -> Micron:
+    return Micron([
+        Header("Table", [
+            Div([
+                Span([Paragraph(f"Row {i}", style=ROW_STYLE), Anchor("open", f"/page/item/{i}.mu", style=[UNDERLINE])])
+                for i in range(rows)
+            ], style=[BACKGROUND_DARKER_GREY, LEFT])
+        ])
+    ])
+
+def deep_tree(depth:int) -> Micron:
+    node = Paragraph("leaf", style=[ITALIC])
+    for i in range(depth):
+        node = Div([Paragraph(f"level {i}"), node], style=[FOREGROUND_GREEN] if i % 2 else [BACKGROUND_BLUE])
+    return Micron([node])
+
+TREES = {
+    "small": lambda: small_tree(),
+    "medium": lambda: table_tree(500),
+    "huge": lambda: table_tree(10000),
+    "deep": lambda: deep_tree(200),
+}
+
+def measure_memory(factory) -> int:
+    """
+    Bytes still allocated after building a tree (i.e. what a module level constant costs).
+    """
+    tracemalloc.start()
+    tree = factory()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return size
+
+def measure_render(tree:Micron, min_time:float=0.5) -> float:
+    """
+    Mean seconds per build(), repeating until min_time has passed.
+    """
+    rounds = 0
+    start = time.perf_counter()
+    while True:
+        tree.build()
+        rounds += 1
+        elapsed = time.perf_counter() - start
+        if elapsed > min_time:
+            return elapsed / rounds
+
+def run() -> dict:
+    results = {}
+    for name, factory in TREES.items():
+        tree = factory()
+        results[name] = {
+            "render_s": measure_render(tree),
+            "bytes": len(tree.build()),
+            "tree_memory": measure_memory(factory),
+        }
+    return results
+
+if __name__ == "__main__":
+    for name, result in run().items():
+        print(f"{name:>8}: {result['render_s'] * 1e6:10.1f} us/build  {result['bytes']:9d} B output  {result['tree_memory'] / 1024:9.1f} KiB tree")
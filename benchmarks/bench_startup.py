@@ -0,0 +1,80 @@
+"""
+Measures import and startup times, each in a fresh interpreter so nothing is cached between runs.
+
+    python benchmarks/bench_startup.py
+
+Full startups run on a Reticulum instance without interfaces (and without a shared
+instance), stored in a temporary directory that has been started once already, so
+the identity and router storage exist as on a restarted node.
+"""
+import os, sys, json, tempfile, subprocess
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+CONFIG = """
+[reticulum]
+  enable_transport = No
+  share_instance = No
+
+[logging]
+  loglevel = 2
+
+[interfaces]
+"""
+
+# Each case prints the seconds it took and the heavy modules that ended up loaded
+PRELUDE = """
+import sys, time, json, os
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+"""
+
+EPILOGUE = """
+elapsed = time.perf_counter() - start
+loaded = [name for name in ("RNS", "LXMF", "lmdb") if name in sys.modules and type(sys.modules[name]).__name__ != "_LazyModule"]
+print(json.dumps({{"seconds": elapsed, "loaded": loaded}}), flush=True)
+os._exit(0)
+"""
+
+CASES = {
+    "import_mu": "import LXMKit.mu",
+    "import_app": "import LXMKit.app",
+    "import_app_and_deps": "import LXMKit.app, RNS, LXMF, lmdb; RNS.Reticulum, LXMF.LXMRouter, lmdb.open",
+    "construct_deferred": """
+from LXMKit.app import LXMFApp
+app = LXMFApp("benchmark", storage_path={storage_path!r}, defer_start=True)
+app.request_handler("/page/index.mu")(lambda: b"Hello World!")
+""",
+    "start": """
+from LXMKit.app import LXMFApp
+app = LXMFApp("benchmark", storage_path={storage_path!r})
+app.request_handler("/page/index.mu")(lambda: b"Hello World!")
+""",
+}
+
+def measure(code:str, storage_path:str) -> dict:
+    """
+    Runs code in a new interpreter, returning the seconds it took and the heavy modules it loaded.
+    """
+    script = (PRELUDE + code + EPILOGUE).format(src=SRC, storage_path=storage_path)
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True, timeout=120).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def run(repeat:int=5) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as storage_path:
+        os.makedirs(storage_path, exist_ok=True)
+        with open(os.path.join(storage_path, "config"), "w") as f:
+            f.write(CONFIG)
+        # Creates the identity and router storage, later starts find them on disk
+        measure(CASES["start"], storage_path)
+
+        for (name, code) in CASES.items():
+            runs = [measure(code, storage_path) for _ in range(repeat)]
+            results[f"{name}_s"] = min(run["seconds"] for run in runs)
+            results[f"{name}_modules"] = ",".join(runs[0]["loaded"]) or "none"
+    return results
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:>28}: {value * 1000:8.1f} ms" if name.endswith("_s") else f"{name:>28}: {value}")
@@ -0,0 +1,378 @@
+"""
+End to end load test of an LXMFApp over a loopback Reticulum network.
+
+A demo app is started in its own process on a local-only Reticulum instance (a TCP
+server interface on 127.0.0.1, no shared instance, no transport, nothing reaching the
+outside network). Client processes, each with their own Reticulum instance and LXMF
+router, connect to it over TCP and run simulated Nomadnet clients. Every client opens
+a link, requests pages (with form variables, cached pages, routed pages and a slow
+page) back to back and sends LXMF messages that the app answers.
+
+Throughput, p50/p99 latency and error rates are reported per path, for messages and
+for link establishment, along with the app's own cache, pool and link stats.
+
+    python benchmarks/loadtest.py --clients 32 --duration 30 --workers 4
+    python benchmarks/loadtest.py --clients 8 --processes 2 --output load.json
+
+LXMF routers only hold one delivery identity, so clients in the same process share
+their message identity; use more processes for more distinct message authors.
+
+RNS sends a request before it registers the receipt waiting for the response, so over
+loopback a response very occasionally arrives first and is missed. Those requests show
+up as errors after --request-timeout, compare with the app's own request counts
+(reported under "server") to tell them apart from requests the app never answered.
+"""
+import os, sys, json, time, socket, random, argparse, tempfile, threading
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+SERVER_CONFIG = """
+[reticulum]
+  enable_transport = No
+  share_instance = No
+  panic_on_interface_error = Yes
+
+[logging]
+  loglevel = {loglevel}
+
+[interfaces]
+  [[Loopback Server]]
+    type = TCPServerInterface
+    enabled = Yes
+    listen_ip = 127.0.0.1
+    listen_port = {port}
+"""
+
+CLIENT_CONFIG = """
+[reticulum]
+  enable_transport = No
+  share_instance = No
+  panic_on_interface_error = Yes
+
+[logging]
+  loglevel = {loglevel}
+
+[interfaces]
+  [[Loopback Client]]
+    type = TCPClientInterface
+    enabled = Yes
+    target_host = 127.0.0.1
+    target_port = {port}
+"""
+
+def write_config(directory:str, template:str, port:int, loglevel:int):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "config"), "w") as f:
+        f.write(template.format(port=port, loglevel=loglevel))
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def percentile(values:list, q:float) -> float:
+    """
+    Nearest rank percentile of an unsorted list, 0 for an empty one.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+def summarize(latencies:list, errors:int, duration:float) -> dict:
+    return {
+        "completed": len(latencies),
+        "errors": errors,
+        "error_rate": errors / max(len(latencies) + errors, 1),
+        "throughput_per_s": len(latencies) / duration,
+        "p50_s": percentile(latencies, 0.5),
+        "p99_s": percentile(latencies, 0.99),
+        "max_s": max(latencies, default=0.0),
+    }
+
+def serve(storage_path:str, port:int, options:dict, ready, stop, results):
+    """
+    Runs the demo app until stop is set, then reports its stats.
+    """
+    write_config(storage_path, SERVER_CONFIG, port, options["loglevel"])
+
+    import RNS
+    from LXMKit.app import LXMFApp, Message
+    from LXMKit.mu import Micron, Header, Paragraph, Anchor, escape
+    from LXMKit.pool import HandlerPool
+    from LXMKit.pipeline import DeliveryPipeline
+    from LXMKit.metrics import Metrics
+
+    pool = HandlerPool(workers=options["workers"], max_queue=1024, per_link=4, per_identity=16) if options["workers"] else None
+    pipeline = DeliveryPipeline(workers=options["workers"]) if options["workers"] else None
+    metrics = Metrics()
+    app = LXMFApp("loadtest", storage_path=storage_path, pool=pool, pipeline=pipeline, metrics=metrics)
+
+    @app.request_handler("/page/index.mu")
+    def index():
+        return Micron([Header("Load test", [Paragraph("Hello World!"), Anchor("Item 1", app.href("/page/item/1.mu"))])]).build()
+
+    @app.request_handler("/page/form.mu")
+    def form(params:dict):
+        return Micron([Paragraph(f"Hello {escape(str(params.get('name', 'Anonymous')))}, you searched for {escape(str(params.get('query', '')))}")]).build()
+
+    @app.request_handler("/page/cached.mu", cache_ttl=options["cache_ttl"])
+    def cached(params:dict):
+        return Micron([Paragraph(f"Expensive page {params.get('page', 1)}") for _ in range(10)]).build()
+
+    @app.request_handler("/page/item/{id}.mu")
+    def item(path_vars:dict):
+        return Micron([Paragraph(f"Item {path_vars['id']}")]).build()
+
+    @app.request_handler("/page/slow.mu")
+    def slow():
+        time.sleep(options["slow_ms"] / 1000)
+        return Micron([Paragraph("Done")]).build()
+
+    @app.delivery_callback
+    def echo(message:Message):
+        message.reply("pong " + message.content)
+
+    # Announces, cache purges and names maintenance run on the app's own scheduler, as in production
+    app.start()
+    app.announce_now()
+    ready.put((app.server_destination.hash, app.source.hash))
+    stop.wait()
+
+    snapshot = metrics.snapshot()
+    results.put({
+        "requests": {labels[0][1]: count for (labels, count) in snapshot["counters"].get("requests_total", {}).items()},
+        "handler_p99_s": {labels[0][1]: histogram["p99"] for (labels, histogram) in snapshot["histograms"].get("handler_seconds", {}).items()},
+        "deliveries": snapshot["counters"].get("deliveries_total", {}).get((), 0),
+        "cache": app.cache.stats,
+        "pool": pool.stats if pool else None,
+        "pipeline": pipeline.stats if pipeline else None,
+        "links": len(app.links),
+        "names": app.names.stats,
+        "announcer": app.announcer.stats,
+        "jobs": app.scheduler.stats,
+    })
+    results.close()
+    results.join_thread()
+    app.stop()
+    os._exit(0)
+
+REQUESTS = (
+    (30, "/page/index.mu", lambda client, i: None),
+    (25, "/page/form.mu", lambda client, i: {"var_name": f"client{client}", "var_query": f"search {i}"}),
+    (25, "/page/cached.mu", lambda client, i: {"var_page": str(i % 5)}),
+    (15, "/page/item", lambda client, i: {"var_route": f"{i % 100}.mu"}),
+    (5, "/page/slow.mu", lambda client, i: None),
+)
+
+def run_clients(storage_path:str, port:int, index:int, clients:list, hashes:tuple, options:dict, results):
+    """
+    Runs a group of simulated clients sharing one Reticulum instance and LXMF router.
+    """
+    write_config(storage_path, CLIENT_CONFIG, port, options["loglevel"])
+
+    import RNS, LXMF
+
+    reticulum = RNS.Reticulum(storage_path)
+    identity = RNS.Identity()
+    router = LXMF.LXMRouter(identity, storagepath=storage_path)
+    source = router.register_delivery_identity(identity, display_name=f"loadtest {index}")
+
+    lock = threading.Lock()
+    pending = {}
+    replies = []
+    def on_reply(lxmessage):
+        content = lxmessage.content_as_string()
+        with lock:
+            sent_at = pending.pop(content[len("pong "):], None)
+            if sent_at is not None:
+                replies.append(time.monotonic() - sent_at)
+    router.register_delivery_callback(on_reply)
+    router.announce(source.hash)
+
+    server_hash, delivery_hash = hashes
+    deadline = time.monotonic() + options["path_timeout"]
+    for destination_hash in (server_hash, delivery_hash):
+        while not RNS.Transport.has_path(destination_hash) and time.monotonic() < deadline:
+            RNS.Transport.request_path(destination_hash)
+            time.sleep(0.5)
+    server_identity = RNS.Identity.recall(server_hash)
+    if server_identity is None:
+        results.put({"index": index, "error": "No path to the app"})
+        return
+
+    server = RNS.Destination(server_identity, RNS.Destination.OUT, RNS.Destination.SINGLE, "nomadnetwork", "node")
+    delivery = RNS.Destination(server_identity, RNS.Destination.OUT, RNS.Destination.SINGLE, "lxmf", "delivery")
+
+    weights = [weight for (weight, _, _) in REQUESTS]
+    requests = {path: {"latencies": [], "errors": 0} for (_, path, _) in REQUESTS}
+    links = {"latencies": [], "errors": 0}
+    messages = {"sent": 0}
+
+    def client(number:int):
+        rng = random.Random(number)
+        established = threading.Event()
+        started = time.monotonic()
+        link = RNS.Link(server, established_callback=lambda link: established.set())
+        if not established.wait(options["request_timeout"]):
+            with lock:
+                links["errors"] += 1
+            link.teardown()
+            return
+        with lock:
+            links["latencies"].append(time.monotonic() - started)
+
+        i = 0
+        while time.monotonic() < end:
+            (_, path, data) = rng.choices(REQUESTS, weights)[0]
+            done = threading.Event()
+            outcome = []
+            started = time.monotonic()
+            link.request(
+                path,
+                data(number, i),
+                response_callback=lambda receipt: (outcome.append(receipt.response is not None), done.set()),
+                failed_callback=lambda receipt: (outcome.append(False), done.set()),
+                timeout=options["request_timeout"],
+            )
+            finished = done.wait(options["request_timeout"] + 5) and outcome[0]
+            with lock:
+                if finished:
+                    requests[path]["latencies"].append(time.monotonic() - started)
+                else:
+                    requests[path]["errors"] += 1
+
+            if rng.random() < options["message_rate"]:
+                content = f"ping {number}:{i}"
+                lxm = LXMF.LXMessage(delivery, source, content, desired_method=LXMF.LXMessage.OPPORTUNISTIC)
+                with lock:
+                    pending[content] = time.monotonic()
+                    messages["sent"] += 1
+                router.handle_outbound(lxm)
+            i += 1
+
+        link.teardown()
+
+    end = time.monotonic() + options["duration"]
+    threads = [threading.Thread(target=client, args=(number,), daemon=True) for number in clients]
+    for thread in threads:
+        thread.start()
+        time.sleep(options["ramp_up"] / max(len(clients), 1))
+    for thread in threads:
+        thread.join()
+
+    # Give the last replies a moment to arrive
+    drain = time.monotonic() + options["drain"]
+    while pending and time.monotonic() < drain:
+        time.sleep(0.1)
+
+    with lock:
+        results.put({
+            "index": index,
+            "requests": requests,
+            "links": links,
+            "messages": {"sent": messages["sent"], "latencies": list(replies), "errors": len(pending)},
+        })
+    results.close()
+    results.join_thread()
+    os._exit(0)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Loopback load test of an LXMFApp")
+    parser.add_argument("--clients", type=int, default=16, help="Number of simulated clients, defaults to 16")
+    parser.add_argument("--processes", type=int, default=1, help="Client processes (distinct Reticulum instances), defaults to 1")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds each client keeps requesting pages, defaults to 20")
+    parser.add_argument("--ramp-up", type=float, default=2, help="Seconds over which clients are started, defaults to 2")
+    parser.add_argument("--workers", type=int, default=4, help="App handler pool and pipeline workers, 0 to run inline, defaults to 4")
+    parser.add_argument("--cache-ttl", type=float, default=30, help="Cache ttl of /page/cached.mu, defaults to 30")
+    parser.add_argument("--slow-ms", type=float, default=50, help="Time /page/slow.mu takes to render, defaults to 50")
+    parser.add_argument("--message-rate", type=float, default=0.05, help="Chance a client sends a message after a request, defaults to 0.05")
+    parser.add_argument("--request-timeout", type=float, default=5, help="Seconds before a request or link counts as failed, defaults to 5")
+    parser.add_argument("--output", help="File to write the JSON report to")
+    parser.add_argument("--verbose", action="store_true", help="Show Reticulum logs")
+    args = parser.parse_args()
+
+    options = {
+        "duration": args.duration,
+        "ramp_up": args.ramp_up,
+        "workers": args.workers,
+        "cache_ttl": args.cache_ttl,
+        "slow_ms": args.slow_ms,
+        "message_rate": args.message_rate,
+        "request_timeout": args.request_timeout,
+        "path_timeout": 30,
+        "drain": 10,
+        "loglevel": 4 if args.verbose else 1,
+    }
+
+    # Every Reticulum instance needs its own process
+    context = multiprocessing.get_context("spawn")
+    port = free_port()
+    ready = context.Queue()
+    stop = context.Event()
+    server_results = context.Queue()
+    client_results = context.Queue()
+
+    with tempfile.TemporaryDirectory() as storage:
+        server = context.Process(target=serve, args=(os.path.join(storage, "server"), port, options, ready, stop, server_results), daemon=True)
+        server.start()
+        hashes = ready.get(timeout=60)
+
+        groups = [list(range(args.clients))[i::args.processes] for i in range(args.processes)]
+        processes = [
+            context.Process(target=run_clients, args=(os.path.join(storage, f"client{i}"), port, i, group, hashes, options, client_results), daemon=True)
+            for (i, group) in enumerate(groups)
+        ]
+        started = time.monotonic()
+        for process in processes:
+            process.start()
+
+        reports = [client_results.get() for _ in processes]
+        elapsed = time.monotonic() - started
+        for process in processes:
+            process.join(10)
+
+        stop.set()
+        server_stats = server_results.get(timeout=30)
+        server.join(10)
+
+    failed = [report["error"] for report in reports if "error" in report]
+    if failed:
+        print("\n".join(failed), file=sys.stderr)
+        return 1
+
+    duration = args.duration
+    paths = {}
+    for (_, path, _) in REQUESTS:
+        latencies = [latency for report in reports for latency in report["requests"][path]["latencies"]]
+        errors = sum(report["requests"][path]["errors"] for report in reports)
+        paths[path] = summarize(latencies, errors, duration)
+
+    all_requests = [latency for report in reports for entry in report["requests"].values() for latency in entry["latencies"]]
+    all_errors = sum(entry["errors"] for report in reports for entry in report["requests"].values())
+    report = {
+        "options": {**options, "clients": args.clients, "processes": args.processes},
+        "elapsed_s": elapsed,
+        "requests": summarize(all_requests, all_errors, duration),
+        "paths": paths,
+        "links": summarize([l for r in reports for l in r["links"]["latencies"]], sum(r["links"]["errors"] for r in reports), duration),
+        "messages": {
+            "sent": sum(r["messages"]["sent"] for r in reports),
+            **summarize([l for r in reports for l in r["messages"]["latencies"]], sum(r["messages"]["errors"] for r in reports), duration),
+        },
+        "server": server_stats,
+    }
+
+    for (name, summary) in [("all requests", report["requests"]), *paths.items(), ("links", report["links"]), ("messages", report["messages"])]:
+        print(f"{name:>16}: {summary['completed']:7d} ok {summary['errors']:5d} err  {summary['throughput_per_s']:8.1f}/s  "
+              f"p50 {summary['p50_s'] * 1000:8.1f}ms  p99 {summary['p99_s'] * 1000:8.1f}ms")
+    print(f"{'app':>16}: {sum(server_stats['requests'].values())} requests, {server_stats['deliveries']} messages, cache {server_stats['cache']}, pool {server_stats['pool']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Runs the benchmark suite and writes the results as JSON, optionally comparing them against a saved baseline.
+
+    python benchmarks/run.py --output baseline.json
+    python benchmarks/run.py --baseline baseline.json --threshold 0.1
+    python benchmarks/run.py --only render,names
+
+Results ending in ``_s`` or ``_ns`` are times (lower is better), results ending in
+``_per_s`` are rates (higher is better), anything else is reported but not compared.
+When a compared result is worse than the baseline by more than the threshold the
+runner exits with status 1, so it can gate changes offline.
+"""
+import os, sys, json, time, argparse, platform, importlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+BENCHMARKS = {
+    "render": "bench_render",
+    "dispatch": "bench_dispatch",
+    "app": "bench_app",
+    "names": "bench_names",
+    "message": "bench_message",
+    "startup": "bench_startup",
+}
+
+def direction(metric:str) -> int:
+    """
+    Returns 1 if higher is better, -1 if lower is better and 0 if the metric isn't compared.
+    """
+    if metric.endswith("_per_s"):
+        return 1
+    if metric.endswith("_s") or metric.endswith("_ns"):
+        return -1
+    return 0
+
+def flatten(results:dict, prefix:str="") -> dict:
+    """
+    Flattens nested results into "bench.case.metric" keys.
+    """
+    flat = {}
+    for (key, value) in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+def compare(results:dict, baseline:dict, threshold:float) -> list:
+    """
+    Prints the change of every comparable metric and returns the ones that regressed beyond threshold.
+    """
+    current = flatten(results)
+    previous = flatten(baseline)
+    regressions = []
+    for (key, value) in current.items():
+        sign = direction(key)
+        old = previous.get(key)
+        if sign == 0 or not old:
+            continue
+
+        # Positive change is an improvement whichever way the metric goes
+        change = sign * (value - old) / old
+        regressed = change < -threshold
+        if regressed:
+            regressions.append(key)
+        print(f"{key:<48} {old:14.6g} -> {value:14.6g}  {change * 100:+7.1f}%{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="LXMKit benchmark suite")
+    parser.add_argument("--only", help=f"Comma separated benchmarks to run, of {', '.join(BENCHMARKS)}")
+    parser.add_argument("--output", help="File to write the JSON results to, defaults to stdout")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown counted as a regression, defaults to 0.2")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    results = {}
+    for name in names:
+        start = time.perf_counter()
+        results[name] = importlib.import_module(BENCHMARKS[name]).run()
+        print(f"{name} done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "time": time.time(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    elif not args.baseline:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold * 100:.0f}%", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Stand-ins for the parts of RNS and LXMF that need a running network, so app code can be benchmarked offline.
+"""
+import os, sys, tempfile, contextlib
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import RNS, LXMF
+
+class StubRouter:
+    """
+    Accepts the calls LXMFApp and Author make on an LXMF router without sending anything.
+    """
+    def __init__(self, identity=None, storagepath=None, **kwargs):
+        self.identity = identity
+        self.outbound = 0
+        self.delivery_callback = None
+
+    def register_delivery_identity(self, identity, display_name=None, stamp_cost=None):
+        return RNS.Destination(identity, RNS.Destination.IN, RNS.Destination.SINGLE, "lxmf", "delivery")
+
+    def register_delivery_callback(self, callback):
+        self.delivery_callback = callback
+
+    def handle_outbound(self, lxmessage):
+        self.outbound += 1
+
+    def get_outbound_propagation_node(self):
+        return None
+
+    def announce(self, destination_hash):
+        pass
+
+class StubLink:
+    """
+    An active link, as far as request dispatch is concerned.
+    """
+    status = RNS.Link.ACTIVE
+    mdu = 431
+
+    def __init__(self, link_id:bytes):
+        self.link_id = link_id
+
+    def set_link_closed_callback(self, callback):
+        pass
+
+class StubMessage:
+    """
+    The parts of an LXMF.LXMessage that Message reads.
+    """
+    def __init__(self, source_hash:bytes, content:str="Hello there!"):
+        self.source_hash = source_hash
+        self.content = content.encode("utf-8")
+
+    def content_as_string(self):
+        return self.content.decode("utf-8")
+
+@contextlib.contextmanager
+def offline():
+    """
+    Patches out Reticulum, the LXMF router and transport registration for the duration of the block.
+
+    Logging is limited to errors, so expected warnings (e.g. unknown links) don't skew timings.
+    """
+    with mock.patch.object(RNS, "loglevel", RNS.LOG_ERROR), \
+        mock.patch.object(RNS, "Reticulum"), \
+        mock.patch.object(LXMF, "LXMRouter", StubRouter), \
+        mock.patch.object(RNS.Transport, "register_destination"), \
+        mock.patch.object(RNS.Transport, "register_announce_handler"), \
+        mock.patch.object(RNS.Transport, "request_path"):
+        yield
+
+@contextlib.contextmanager
+def stub_app(**kwargs):
+    """
+    Yields an LXMFApp built on the stubs, stored in a temporary directory that is removed afterwards.
+    """
+    from LXMKit.app import LXMFApp
+
+    with offline(), tempfile.TemporaryDirectory() as storage_path:
+        app = LXMFApp("benchmark", storage_path=storage_path, **kwargs)
+        try:
+            yield app
+        finally:
+            app.stop()
@@ -0,0 +1,33 @@
+import asyncio, threading
+from .lazy import lazy_import
+
+RNS = lazy_import("RNS")
+
+class EventLoopThread:
+    """
+    Runs an asyncio event loop on a daemon thread, so that RNS and LXMF callbacks
+    (which are plain threads) can hand coroutines over to it.
+    """
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops the loop and waits for its thread to exit, unless called from the loop itself.
+        """
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if threading.current_thread() is not self.thread:
+            self.thread.join()
+            self.loop.close()
+
+def log_failure(future):
+    """
+    Done callback that logs the exception of a failed coroutine instead of losing it.
+    """
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        RNS.log(f"Async callback failed: {error}", RNS.LOG_ERROR)
@@ -1,4 +1,21 @@
-import RNS, LXMF, time, os, lmdb, inspect
+from __future__ import annotations
+import time, os, random, inspect, asyncio, threading, atexit
+from .mu import Micron, Paragraph, FOREGROUND_RED, PAGE_VARIABLE
+from .routing import Router, ROUTE_VARIABLE
+from .cache import ResponseCache, LRUCache
+from .pool import HandlerPool
+from .aio import EventLoopThread, log_failure
+from .pipeline import DeliveryPipeline
+from .names import NameStore, decode_display_name
+from .static import StaticDirectory
+from .streaming import ResponseStreamer, send_response
+from .metrics import Metrics
+from .scheduler import Scheduler, Announcer
+from .outbox import Outbox, OPPORTUNISTIC, DIRECT, PROPAGATED, PAPER
+from .lazy import lazy_import
+
+RNS = lazy_import("RNS")
+LXMF = lazy_import("LXMF")
 
 class AnnounceHandler:
     """
@@ -14,15 +31,16 @@ class AnnounceHandler:
         """
         try:
             self.received_announce_callback(self.aspect_filter, destination_hash, announced_identity, app_data, announce_packet_hash)
-        except:
-            pass
+        except Exception as e:
+            RNS.log(f"Failed to handle {self.aspect_filter} announce: {e}", RNS.LOG_ERROR)
 
 class Author:
     """
     Represents an author of an LXMF message with associated identity and routing.
 
     This class encapsulates an identity for sending messages via an LXMF router,
-    with optional display name resolution via a callback.
+    with optional display name resolution via a callback. If the identity isn't
+    known yet (no announce seen), it is recalled again when sending.
 
     :param identity_hash: Hash of the author's identity.
     :type identity_hash: bytes
@@ -30,14 +48,42 @@ class Author:
     :type router: LXMF.LXMRouter
     :param source: Source destination for message delivery.
     :type source: RNS.Destination
-    :param display_name_callback: Optional callback to resolve display name, defaults to None.
+    :param display_name_callback: Optional callback to resolve display name (as str, or raw announce bytes), defaults to None.
     :type display_name_callback: callable, optional
+    :param metrics: Registry recording sends, defaults to None.
+    :type metrics: Metrics, optional
+    :param outbox: Persistent queue messages are sent through instead of straight to the router, defaults to None.
+    :type outbox: Outbox, optional
     """
-    def __init__(self, identity_hash:bytes, router:LXMF.LXMRouter, source:RNS.Destination, display_name_callback=None):
+    METHOD_NAMES = {
+        OPPORTUNISTIC: "opportunistic",
+        DIRECT: "direct",
+        PROPAGATED: "propagated",
+        PAPER: "paper",
+    }
+
+    def __init__(self, identity_hash:bytes, router:LXMF.LXMRouter, source:RNS.Destination, display_name_callback=None, metrics:Metrics | None=None, outbox:Outbox | None=None):
         self.identity_hash = identity_hash
         self.display_name_callback = display_name_callback
+        self.metrics = metrics
+        self.outbox = outbox
         self.router = router
-        self._identity = RNS.Identity.recall(identity_hash)
+        self.source = source
+        self._identity = None
+        self._destination = None
+        self._resolve()
+
+    def _resolve(self) -> bool:
+        """
+        Recalls the identity and builds the outbound destination, returning False if the identity is still unknown.
+        """
+        if self._destination is not None:
+            return True
+
+        self._identity = RNS.Identity.recall(self.identity_hash)
+        if self._identity is None:
+            return False
+
         self._destination = RNS.Destination(
             self._identity,
             RNS.Destination.OUT,
@@ -45,14 +91,23 @@ class Author:
             "lxmf",
             "delivery"
         )
-        self.source = source
+        return True
+
+    @property
+    def known(self) -> bool:
+        """
+        Whether the author's identity is known, i.e. messages can be sent to them.
+
+        :rtype: bool
+        """
+        return self._resolve()
     
     @property
     def display_name(self) -> str | None:
         """
         Retrieves the author's display name using the callback.
 
-        Filters the name to include only printable ASCII characters.
+        Raw announce data is decoded (legacy or msgpack format) and filtered to printable characters.
 
         :return: The display name or None if not available.
         :rtype: str | None
@@ -61,10 +116,9 @@ class Author:
             return None
         
         name = self.display_name_callback(self.identity_hash)
-        if name is None:
-            return None
-        
-        return ''.join(c for c in name.decode('ascii', errors='ignore') if c.isprintable())
+        if isinstance(name, bytes):
+            return decode_display_name(name)
+        return name
     
     @property
     def hash(self):
@@ -76,17 +130,35 @@ class Author:
         """
         return str(RNS.prettyhexrep(self.identity_hash))
     
-    def send(self, content, method=LXMF.LXMessage.OPPORTUNISTIC, include_ticket=True):
+    def send(self, content, method=OPPORTUNISTIC, include_ticket=True):
         """
         Sends an LXMF message with the specified content.
 
+        With an outbox the message is queued on disk and sent (and retried) from there,
+        even if the author's identity isn't known yet.
+
         :param content: The message content to send.
         :type content: str
         :param method: Delivery method (e.g., OPPORTUNISTIC), defaults to LXMF.LXMessage.OPPORTUNISTIC.
         :type method: int
         :param include_ticket: Whether to include a ticket, defaults to True.
         :type include_ticket: bool
+        :return: False if the author's identity is unknown and nothing was sent.
+        :rtype: bool
         """
+        if self.outbox is not None:
+            self.outbox.enqueue(self.identity_hash, content, method, include_ticket)
+            return True
+
+        started = time.perf_counter()
+        method_name = self.METHOD_NAMES.get(method, str(method))
+        if not self._resolve():
+            RNS.log(f"Cannot send to {self.hash} yet, their identity is unknown. Requesting a path.", RNS.LOG_WARNING)
+            RNS.Transport.request_path(self.identity_hash)
+            if self.metrics is not None:
+                self.metrics.inc("send_unknown_total", method=method_name)
+            return False
+
         lxm = LXMF.LXMessage(
             self._destination,
             self.source,
@@ -95,6 +167,25 @@ class Author:
             include_ticket=include_ticket
         )
         self.router.handle_outbound(lxm)
+        if self.metrics is not None:
+            self.metrics.inc("sent_total", method=method_name)
+            self.metrics.observe("send_seconds", time.perf_counter() - started, method=method_name)
+        return True
+
+    async def send_async(self, content, method=OPPORTUNISTIC, include_ticket=True):
+        """
+        Awaitable version of :meth:`send`, packing and queueing the message off the event loop.
+
+        :param content: The message content to send.
+        :type content: str
+        :param method: Delivery method (e.g., OPPORTUNISTIC), defaults to LXMF.LXMessage.OPPORTUNISTIC.
+        :type method: int
+        :param include_ticket: Whether to include a ticket, defaults to True.
+        :type include_ticket: bool
+        :return: False if the author's identity is unknown and nothing was sent.
+        :rtype: bool
+        """
+        return await asyncio.to_thread(self.send, content, method, include_ticket)
 
 class Message:
     """
@@ -110,15 +201,17 @@ class Message:
     :type source: RNS.Destination
     :param display_name_callback: Optional callback to resolve author's display name, defaults to None.
     :type display_name_callback: callable, optional
+    :param author: Already known author of the message (e.g. from the app's cache), defaults to None.
+    :type author: Author, optional
     """
-    def __init__(self, lxmessage:LXMF.LXMessage, router: LXMF.LXMRouter, source: RNS.Destination, display_name_callback=None):
+    def __init__(self, lxmessage:LXMF.LXMessage, router: LXMF.LXMRouter, source: RNS.Destination, display_name_callback=None, author:Author | None=None):
         assert isinstance(lxmessage.source_hash, bytes), "invalid message hash"
 
         self.lxmessage = lxmessage
         self.content:str = lxmessage.content_as_string() # type: ignore
-        self.author = Author(lxmessage.source_hash, router, source, display_name_callback)
+        self.author = author or Author(lxmessage.source_hash, router, source, display_name_callback)
     
-    def reply(self, content, method=LXMF.LXMessage.OPPORTUNISTIC, include_ticket=True):
+    def reply(self, content, method=OPPORTUNISTIC, include_ticket=True):
         """
         Sends a reply to the message.
 
@@ -128,8 +221,192 @@ class Message:
         :type method: int
         :param include_ticket: Whether to include a ticket, defaults to True.
         :type include_ticket: bool
+        :return: False if the author's identity is unknown and nothing was sent.
+        :rtype: bool
         """
-        self.author.send(content, method, include_ticket)
+        return self.author.send(content, method, include_ticket)
+
+    async def reply_async(self, content, method=OPPORTUNISTIC, include_ticket=True):
+        """
+        Awaitable version of :meth:`reply`.
+
+        :param content: The reply content.
+        :type content: str
+        :param method: Delivery method, defaults to LXMF.LXMessage.OPPORTUNISTIC.
+        :type method: int
+        :param include_ticket: Whether to include a ticket, defaults to True.
+        :type include_ticket: bool
+        :return: False if the author's identity is unknown and nothing was sent.
+        :rtype: bool
+        """
+        return await self.author.send_async(content, method, include_ticket)
+
+class RequestHandler:
+    """
+    A registered request handler together with its precompiled argument binder.
+
+    The handler signature is inspected once at registration time to work out which
+    of the injectable arguments (params, path, link, data, request_id, remote_identity,
+    requested_at, path_vars) it accepts, so dispatching a request is just the binder plus the call.
+
+    :param func: The user function handling the request.
+    :type func: callable
+    :param resolve_params: Function used to clean up the raw request data into params.
+    :type resolve_params: callable
+    :param cache: Response cache shared by the app, only used when cache_ttl is set.
+    :type cache: ResponseCache, optional
+    :param cache_ttl: Seconds to keep a rendered response for, defaults to None (no caching).
+    :type cache_ttl: float, optional
+    :param vary: What besides the path makes responses differ, any of "params", "remote_identity" and "link".
+    :type vary: list, optional
+    :param paginate: Split returned Micron pages to fit the link MDU (True) or a byte budget (int), defaults to False.
+    :type paginate: bool | int, optional
+    :param href: Function building the link target of a request path, used by the page links.
+    :type href: callable, optional
+    :param metrics: Registry recording handler durations and errors, defaults to None.
+    :type metrics: Metrics, optional
+    :param label: Path the handler was registered for, used to label its metrics.
+    :type label: str, optional
+    """
+    # Positions of the injectable arguments in a dispatched request
+    INJECTABLE = {
+        "path": 0,
+        "data": 1,
+        "request_id": 2,
+        "link": 3,
+        "found_link": 3,
+        "remote_identity": 4,
+        "requested_at": 5,
+        "path_vars": 6,
+    }
+
+    VARY = ("params", "remote_identity", "link")
+
+    # Bytes RNS adds around a response, umsgpack.packb([request_id, response]) with a 16 byte id and a bin16 header
+    RESPONSE_OVERHEAD = 22
+
+    def __init__(self, func, resolve_params, cache:ResponseCache | None=None, cache_ttl:float | None=None, vary=("params",),
+                 paginate:bool | int=False, href=None, metrics:Metrics | None=None, label:str | None=None):
+        self.func = func
+        self.resolve_params = resolve_params
+        self.is_async = inspect.iscoroutinefunction(func)
+
+        assert cache_ttl is None or cache is not None, "A cache is required to use cache_ttl."
+        assert all(v in self.VARY for v in vary), f"Can only vary on {', '.join(self.VARY)}."
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self.vary = tuple(vary)
+        self.paginate = paginate
+        self.href = href or (lambda path: path)
+        self.metrics = metrics
+        self.label = label
+
+        params = inspect.signature(func).parameters
+        self.wants_params = "params" in params
+        self.picks = tuple(
+            (name, index) for (name, index) in self.INJECTABLE.items()
+            if name in params and not (name == "found_link" and "link" in params)
+        )
+
+    def bind(self, path, data, request_id, link, remote_identity, requested_at, path_vars=None) -> dict:
+        """
+        Builds the keyword arguments the handler asked for.
+        """
+        request = (path, data, request_id, link, remote_identity, requested_at, path_vars or {})
+        kwargs = {name: request[index] for (name, index) in self.picks}
+        if self.wants_params:
+            kwargs["params"] = self.resolve_params(data)
+        return kwargs
+
+    def variant(self, data, link, remote_identity) -> tuple:
+        """
+        Builds the part of the cache key that comes from the request rather than the path.
+        """
+        parts = []
+        for name in self.vary:
+            if name == "params":
+                parts.append((name, ResponseCache.normalize(self.resolve_params(data))))
+            elif name == "remote_identity":
+                parts.append((name, None if remote_identity is None else remote_identity.hash))
+            elif name == "link":
+                parts.append((name, link.link_id))
+        if self.paginate and not "params" in self.vary:
+            parts.append((PAGE_VARIABLE, self.page_number(data)))
+        return tuple(parts)
+
+    def page_number(self, data) -> int:
+        """
+        Returns the requested page number, 1 if it is missing or malformed.
+        """
+        try:
+            return max(int(self.resolve_params(data).get(PAGE_VARIABLE, 1)), 1)
+        except (TypeError, ValueError):
+            return 1
+
+    def page(self, response, path, data, link):
+        """
+        Renders the requested page of a Micron response, other responses are returned as is.
+        """
+        if not self.paginate or not isinstance(response, Micron):
+            return response
+
+        budget = link.mdu - self.RESPONSE_OVERHEAD if self.paginate is True else self.paginate
+        pages = response.paginate(budget, self.href(path.partition("`")[0]))
+        return pages[min(self.page_number(data), len(pages)) - 1]
+
+    def cached(self, path, data, link, remote_identity) -> bytes | None:
+        """
+        Returns the cached response for this request, if caching is enabled and it is fresh.
+        """
+        if self.cache_ttl is None:
+            return None
+        return self.cache.get(path, self.variant(data, link, remote_identity))
+
+    def _record(self, started:float, failed:bool=False):
+        """
+        Records how long the handler (and pagination) took, if metrics are enabled.
+        """
+        if self.metrics is None:
+            return
+        self.metrics.observe("handler_seconds", time.perf_counter() - started, path=self.label)
+        if failed:
+            self.metrics.inc("handler_errors_total", path=self.label)
+
+    def respond(self, path, data, request_id, link, remote_identity, requested_at, path_vars=None):
+        """
+        Runs the handler, storing the response if caching is enabled.
+        """
+        started = time.perf_counter()
+        try:
+            response = self.page(self.func(**self.bind(path, data, request_id, link, remote_identity, requested_at, path_vars)), path, data, link)
+        except Exception:
+            self._record(started, True)
+            raise
+        self._record(started)
+        if self.cache_ttl is not None and isinstance(response, bytes):
+            self.cache.put(path, self.variant(data, link, remote_identity), response, self.cache_ttl)
+        return response
+
+    async def respond_async(self, path, data, request_id, link, remote_identity, requested_at, path_vars=None):
+        """
+        Awaits a coroutine handler, storing the response if caching is enabled.
+        """
+        started = time.perf_counter()
+        try:
+            response = self.page(await self.func(**self.bind(path, data, request_id, link, remote_identity, requested_at, path_vars)), path, data, link)
+        except Exception:
+            self._record(started, True)
+            raise
+        self._record(started)
+        if self.cache_ttl is not None and isinstance(response, bytes):
+            self.cache.put(path, self.variant(data, link, remote_identity), response, self.cache_ttl)
+        return response
+
+    def __call__(self, path, data, request_id, link, remote_identity, requested_at, path_vars=None):
+        response = self.cached(path, data, link, remote_identity)
+        if response is None:
+            response = self.respond(path, data, request_id, link, remote_identity, requested_at, path_vars)
+        return response
 
 class LXMFApp:
     """
@@ -142,20 +419,125 @@ class LXMFApp:
     :type app_name: str
     :param storage_path: Path for storing identity and name data, defaults to "./lxmf".
     :type storage_path: str
-    :param announce: Number of seconds to wait between announces
+    :param announce: Number of seconds to wait between announces, the interval backs off from here while nothing changes.
     :type announce: int
+    :param cache_size: Maximum number of cached page responses, defaults to 1024.
+    :type cache_size: int
+    :param pool: Worker pool to run request handlers on instead of the RNS thread, defaults to None (inline).
+    :type pool: HandlerPool, optional
+    :param pipeline: Pipeline to process inbound messages on, in parallel across authors, defaults to None (inline).
+    :type pipeline: DeliveryPipeline, optional
+    :param author_cache_size: Maximum number of message authors (and their outbound destinations) kept around, defaults to 1024.
+    :type author_cache_size: int
+    :param names_ttl: Seconds before names of peers that stopped announcing are forgotten, None to keep forever, defaults to 30 days.
+    :type names_ttl: float, optional
+    :param streamer: Handles generator, file and path responses, defaults to ResponseStreamer().
+    :type streamer: ResponseStreamer, optional
+    :param metrics: Registry recording request, delivery, send and names store metrics, defaults to None (disabled).
+    :type metrics: Metrics, optional
+    :param announce_max: Longest interval announces back off to while nothing changes, defaults to 6 times announce.
+    :type announce_max: int, optional
+    :param announce_jitter: Fraction of the interval announces are randomly spread by, defaults to 0.1.
+    :type announce_jitter: float
+    :param outbox_rate: Messages per second sent through a persistent outbox, defaults to None (sent straight to the router).
+    :type outbox_rate: float, optional
+    :param host: Host sharing its Reticulum instance, names store and scheduler with the app, defaults to None (the app owns its own). Use :meth:`Host.add` rather than passing this directly.
+    :type host: Host, optional
+    :param defer_start: Only start Reticulum, load the identity and open the names store on :meth:`run` or :meth:`start`, so handlers can be registered (e.g. by tools and tests) without touching the network, defaults to False.
+    :type defer_start: bool
     """
-    def __init__(self, app_name:str, storage_path:str="./lxmf", announce:int=600):
+    # Seconds between checks for due announces and changed app data
+    ANNOUNCE_CHECK_INTERVAL = 30
+
+    # Seconds between purges of expired cached responses
+    CACHE_PURGE_INTERVAL = 60
+
+    # Seconds between expiry and compaction passes over the names store
+    NAMES_MAINTENANCE_INTERVAL = 3600
+
+    def __init__(self, app_name:str, storage_path:str="./lxmf", announce:int=600, cache_size:int=1024, pool:HandlerPool | None=None, pipeline:DeliveryPipeline | None=None, author_cache_size:int=1024, names_ttl:float | None=30*24*3600, streamer:ResponseStreamer | None=None, metrics:Metrics | None=None, announce_max:int | None=None, announce_jitter:float=0.1, outbox_rate:float | None=None, host=None, defer_start:bool=False):
         self.app_name = app_name
         self.storage_path = storage_path
         self.function_paths = {}
-        self.rns = RNS.Reticulum(storage_path)
-        self.names = lmdb.open(os.path.join(storage_path, "names"), map_size=10485760)
-        identity_path = os.path.join(storage_path, "identity")
+        self.routes = Router()
+        self.cache = ResponseCache(cache_size)
+        self.pool = pool
+        self.pipeline = pipeline
+        self.streamer = streamer or ResponseStreamer()
+        self.authors = LRUCache(author_cache_size)
+        self.static_dirs:list[StaticDirectory] = []
+        # Handlers registered for static files by path, only these are dropped when a file goes away
+        self.static_handlers:dict[str, RequestHandler] = {}
+        self.loop:asyncio.AbstractEventLoop | None = None
+        self.loop_thread:EventLoopThread | None = None
+        self.loop_lock = threading.Lock()
+        self.links = {}
+        self.host = host
+        self.names_ttl = names_ttl
+        self.outbox_rate = outbox_rate
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.collect("cache", lambda: self.cache.stats)
+            metrics.collect("authors", lambda: self.authors.stats)
+            metrics.collect("streamer", lambda: self.streamer.stats)
+            metrics.collect("links", lambda: {"active": len(self.links)})
+            if pool is not None:
+                metrics.collect("pool", lambda: pool.stats)
+            if pipeline is not None:
+                metrics.collect("pipeline", lambda: pipeline.stats)
 
         assert announce > 30, "Should not perform an announce fewer than every 30 seconds."
+        assert not (defer_start and host is not None), "Hosted apps are started with their host."
         self.announce = announce
-        
+        self.stopped = False
+
+        # Set up on start, see _setup()
+        self.rns = None
+        self.names:NameStore | None = None
+        self.identity:RNS.Identity | None = None
+        self.server_destination:RNS.Destination | None = None
+        self.router:LXMF.LXMRouter | None = None
+        self.source:RNS.Destination | None = None
+        self.outbox:Outbox | None = None
+        self.delivery_wrapper = None
+
+        self.announcer = Announcer(announce, announce_max, jitter=announce_jitter)
+        self.announcer.add("server", lambda app_data: self.server_destination.announce(app_data=app_data), lambda: self.app_name.encode("utf-8"))
+        self.announcer.add("delivery", lambda app_data: self.router.announce(self.source.hash), lambda: self.router.get_announce_app_data(self.source.hash))
+
+        self.scheduler = Scheduler() if host is None else host.scheduler
+        # The first announce goes out within a few seconds, spread so nodes restarted together don't announce together
+        self.scheduler.add(self._job_name("announce"), self.announcer.check, self.ANNOUNCE_CHECK_INTERVAL, delay=random.uniform(0, 5))
+        self.scheduler.add(self._job_name("cache"), self.cache.purge_expired, self.CACHE_PURGE_INTERVAL)
+        if metrics is not None:
+            metrics.collect("announcer", lambda: self.announcer.stats)
+
+        if not defer_start:
+            self._setup()
+
+        # Only once the app is fully built, a failed construction leaves no hook behind
+        atexit.register(self.stop)
+
+    def _setup(self):
+        """
+        Starts Reticulum, loads (or creates) the identity, registers the destinations and handlers, and opens the names store and outbox.
+        Runs on construction, or on run() or start() if the app was created with defer_start.
+        """
+        if self.router is not None:
+            return
+
+        if self.host is None:
+            self.rns = RNS.Reticulum(self.storage_path)
+            self.names = NameStore(os.path.join(self.storage_path, "names"), ttl=self.names_ttl, maintenance_interval=None, metrics=self.metrics)
+            self.scheduler.add("names", self.names.maintain, self.NAMES_MAINTENANCE_INTERVAL)
+            if self.metrics is not None:
+                self.metrics.collect("names", lambda: self.names.stats)
+        else:
+            os.makedirs(self.storage_path, exist_ok=True)
+            self.rns = self.host.rns
+            self.names = self.host.names
+
+        identity_path = os.path.join(self.storage_path, "identity")
         if not os.path.exists(identity_path):
             self.identity = RNS.Identity()
             self.identity.to_file(identity_path)
@@ -169,8 +551,12 @@ class LXMFApp:
             "nomadnetwork",
             "node"
         )
+        self.server_destination.set_link_established_callback(self._on_link_established)
+        # Handlers registered before the app was set up
+        for path in [*self.function_paths, *self.routes.mounts]:
+            self._register_request_path(path)
         
-        self.router = LXMF.LXMRouter(self.identity, storagepath=storage_path)
+        self.router = LXMF.LXMRouter(self.identity, storagepath=self.storage_path)
         
         self.source = self.router.register_delivery_identity(
             self.identity,
@@ -179,21 +565,80 @@ class LXMFApp:
 
         assert not self.source is None, "Failed to register identity"
 
-        RNS.Transport.register_announce_handler(AnnounceHandler("lxmf.delivery", self._on_lxmf_announce_received))
+        if self.delivery_wrapper is not None:
+            self.router.register_delivery_callback(self.delivery_wrapper)
+
+        if self.outbox_rate is not None:
+            self.outbox = Outbox(os.path.join(self.storage_path, "outbox"), self.router, self.source, rate=self.outbox_rate, metrics=self.metrics)
+            if self.metrics is not None:
+                self.metrics.collect("outbox", lambda: self.outbox.stats)
+
+        # A host receives announces once for all of its apps
+        if self.host is None:
+            RNS.Transport.register_announce_handler(AnnounceHandler("lxmf.delivery", self._on_lxmf_announce_received))
+
+    def _job_name(self, name:str) -> str:
+        """
+        Returns the name of one of the app's scheduler jobs, prefixed with the app name when the scheduler is shared by a host.
+        """
+        return name if self.host is None else f"{self.app_name}: {name}"
+
+    def _on_link_established(self, link:RNS.Link):
+        """
+        Indexes a newly established link so requests can find it by id.
+        """
+        self.links[link.link_id] = link
+        link.set_link_closed_callback(self._on_link_closed)
+
+    def _on_link_closed(self, link:RNS.Link):
+        """
+        Drops a closed (or timed out) link from the index.
+        """
+        self.links.pop(link.link_id, None)
+
+    def _error_response(self, message:str) -> bytes:
+        """
+        Renders a minimal micron page used when a request cannot be served.
+        """
+        return Micron([Paragraph(message, style=[FOREGROUND_RED])]).build()
 
     def _on_lxmf_announce_received(self, aspect, destination_hash, announced_identity:RNS.Identity, app_data, announce_packet_hash):
         """
         Handles received LXMF display name announce packets and stores app data.
         """
-        with self.names.begin(write=True) as txn:
-            txn.put(destination_hash, app_data)
+        # The announce may carry a new identity/ratchet, rebuild the author on next use
+        self.authors.pop(destination_hash)
+        self.names.put(destination_hash, app_data)
+        if self.metrics is not None:
+            self.metrics.inc("announces_total")
+
+    def get_author(self, identity_hash:bytes) -> Author:
+        """
+        Returns the (cached) author for an identity hash, reusing its recalled identity and outbound destination.
+
+        :param identity_hash: Hash of the author's identity.
+        :type identity_hash: bytes
+        :rtype: Author
+        """
+        assert not self.source is None, "Failed to register identity"
+
+        author = self.authors.get(identity_hash)
+        if author is None:
+            author = Author(identity_hash, self.router, self.source, self.get_display_name, self.metrics, self.outbox)
+            self.authors.put(identity_hash, author)
+        return author
 
     def get_name(self, identity_hash:bytes):
         """
         Retrieves the name associated with an identity hash.
         """
-        with self.names.begin() as txn:
-            return txn.get(identity_hash)
+        return self.names.get(identity_hash)
+
+    def get_display_name(self, identity_hash:bytes) -> str | None:
+        """
+        Retrieves the decoded display name associated with an identity hash, cached in memory.
+        """
+        return self.names.display_name(identity_hash)
         
     def resolve_params(self, data:dict) -> dict:
         """
@@ -209,98 +654,442 @@ class LXMFApp:
         """
         Wraps request handling to match RNS link with the registered function.
         """
-        found_link = None
-        for link in self.server_destination.links:
-            link:RNS.Link
-            if link.link_id == link_id:
-                found_link = link
-                break
-        
-        assert not found_link is None, "RNS is bugging out? I don't know how you got here"
+        if self.metrics is None:
+            return self._route(path, data, request_id, link_id, remote_identity, requested_at)
 
-        # Get the intended function to handle provided path
-        target_func = self.function_paths[path.split("`")[0]]
-        
-        # This is a bit of a hack to make it more easy to write decorators
-        sig = inspect.signature(target_func)
-        params = sig.parameters
-
-        kwargs = {}
-        if 'params' in params:
-            kwargs['params'] = self.resolve_params(data)
-        if 'path' in params:
-            kwargs['path'] = path
-        if 'link' in params or 'found_link' in params:
-            kwargs['link' if 'link' in params else 'found_link'] = found_link
-        if 'data' in params:
-            kwargs['data'] = data
-        if 'request_id' in params:
-            kwargs['request_id'] = request_id
-        if 'remote_identity' in params:
-            kwargs['remote_identity'] = remote_identity
-        if 'requested_at' in params:
-            kwargs['requested_at'] = requested_at
-
-        # Call the target function with the supported arguments
-        return target_func(**kwargs)
-
-    def request_handler(self, path):
+        # Time to respond, or to hand the request over to the pool or event loop
+        label = path.partition("`")[0]
+        started = time.perf_counter()
+        try:
+            return self._route(path, data, request_id, link_id, remote_identity, requested_at)
+        except Exception:
+            self.metrics.inc("request_errors_total", path=label)
+            raise
+        finally:
+            self.metrics.inc("requests_total", path=label)
+            self.metrics.observe("request_seconds", time.perf_counter() - started, path=label)
+
+    def _route(self, path, data, request_id, link_id, remote_identity, requested_at):
+        """
+        Finds the link and the handler for a request and dispatches it.
+        """
+        found_link:RNS.Link | None = self.links.get(link_id)
+        if found_link is None or found_link.status == RNS.Link.CLOSED:
+            self.links.pop(link_id, None)
+            RNS.log(f"Request for '{path}' on unknown link {RNS.prettyhexrep(link_id)}", RNS.LOG_WARNING)
+            return self._error_response("Link not found, please reconnect.")
+
+        # Get the intended handler for the provided path, arguments are bound by its precompiled plan
+        base, _, route = path.partition("`")
+        handler:RequestHandler | None = self.function_paths.get(base)
+        if handler is not None:
+            return self._dispatch(handler, path, data, request_id, found_link, remote_identity, requested_at)
+
+        # Otherwise the path is a route mount, the rest of the path is carried after the backtick or in the route variable
+        if base in self.routes.mounts:
+            route = route or (data or {}).get("var_" + ROUTE_VARIABLE, "")
+            path = self.routes.resolve(base, route)
+            match = self.routes.match(path)
+            if match is not None:
+                handler, path_vars = match
+                return self._dispatch(handler, path, data, request_id, found_link, remote_identity, requested_at, path_vars)
+
+        return self._error_response(f"Page '{path}' not found.")
+
+    def _submit(self, coroutine):
+        """
+        Schedules a coroutine on the app's event loop, starting a loop thread if run_async isn't being used.
+        """
+        with self.loop_lock:
+            if self.loop is None:
+                self.loop_thread = EventLoopThread()
+                self.loop = self.loop_thread.loop
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def _dispatch(self, handler:RequestHandler, path, data, request_id, link:RNS.Link, remote_identity, requested_at, path_vars=None):
+        """
+        Runs the handler inline, or queues it on the worker pool / event loop and responds once it finishes.
+        """
+        if self.pool is None and not handler.is_async:
+            response = handler(path, data, request_id, link, remote_identity, requested_at, path_vars)
+            if self.streamer.is_streamed(response):
+                self._send_response(link, request_id, response)
+                return None
+            return response
+
+        # Cache hits are cheap, no need to wait behind slow handlers
+        response = handler.cached(path, data, link, remote_identity)
+        if response is not None:
+            return response
+
+        if handler.is_async:
+            def done(future):
+                if not future.cancelled() and future.exception() is None:
+                    self._send_response(link, request_id, future.result())
+                else:
+                    self._send_response(link, request_id, self._error_response("Something went wrong, please try again."))
+                    log_failure(future)
+
+            future = self._submit(handler.respond_async(path, data, request_id, link, remote_identity, requested_at, path_vars))
+            future.add_done_callback(done)
+            return None
+
+        def job():
+            try:
+                response = handler.respond(path, data, request_id, link, remote_identity, requested_at, path_vars)
+            except Exception:
+                self._send_response(link, request_id, self._error_response("Something went wrong, please try again."))
+                raise
+            self._send_response(link, request_id, response)
+
+        identity_hash = None if remote_identity is None else remote_identity.hash
+        if not self.pool.submit(link.link_id, identity_hash, job):
+            return self._error_response("Server busy, please try again shortly.")
+
+        # Nothing is sent by RNS when we return None, the worker responds instead
+        return None
+
+    def _send_response(self, link:RNS.Link, request_id, response):
+        """
+        Sends a response for a request outside of the RNS request callback, streaming it if needed.
+        """
+        if self.streamer.is_streamed(response):
+            if not self.streamer.send(link, request_id, response):
+                send_response(link, request_id, self._error_response("Server busy, please try again shortly."))
+        else:
+            send_response(link, request_id, response)
+
+    def href(self, path:str) -> str:
+        """
+        Builds a link target for a concrete path, routing it through its mount if it was registered as a pattern.
+
+        :param path: Concrete path, e.g. "/page/item/42.mu".
+        :type path: str
+        :return: Link target usable as an Anchor href.
+        :rtype: str
+        """
+        return self.routes.href(path)
+
+    def invalidate(self, path:str, params:dict | None=None) -> int:
+        """
+        Removes cached responses for a path so the next request re-runs its handler.
+
+        :param path: The concrete request path, e.g. "/page/index.mu".
+        :type path: str
+        :param params: Only invalidate the response for these params, defaults to every variant.
+        :type params: dict, optional
+        :return: Number of responses removed.
+        :rtype: int
+        """
+        return self.cache.invalidate(path, params)
+
+    def request_handler(self, path, cache_ttl:float | None=None, vary=("params",), paginate:bool | int=False):
         """
         Decorator to register a request handler for a specific path.
 
+        Paths may contain variables such as "/page/item/{id}.mu" or a trailing greedy
+        "{rest*}", these are registered once on their static prefix and resolved in-process.
+        Matched values are available to the handler through the path_vars argument.
+
+        When cache_ttl is set, the returned bytes are cached per path and per the normalized
+        values listed in vary, and repeated requests are served without calling the handler.
+
         :param path: The request path to handle.
         :type path: str
+        :param cache_ttl: Seconds to cache responses for, defaults to None (no caching).
+        :type cache_ttl: float, optional
+        :param vary: What besides the path the response depends on, any of "params", "remote_identity" and "link".
+        :type vary: list, optional
+        :param paginate: When the handler returns a Micron tree (rather than bytes), split it into pages that fit in a single packet of the requesting link (True) or in a byte budget (int). Pages are requested with the "page" variable and link to each other.
+        :type paginate: bool | int, optional
         :return: Decorator function.
         :rtype: callable
-        :raises AssertionError: If path contains wildcards or variables.
+        :raises ValueError: If path contains bare wildcards, or clashes with a route mount or registered path.
+        :raises AssertionError: If path contains malformed variables.
         """
-        assert not "*" in path, f"Wild flags in path '{path}' not supported by RNS."
-        assert not ("{" in path or "}" in path), f"Variables in path '{path}' not supported by RNS."
-        
+        if not Router.is_pattern(path) and "*" in path:
+            raise ValueError(f"Wild flags in path '{path}' not supported by RNS.")
+
         def decorator(func):
-            self.function_paths[path] = func
-            self.server_destination.register_request_handler(
-                path,
-                response_generator=self._response_wrapper,
-                allow=RNS.Destination.ALLOW_ALL
-            )
+            # Conflicts are checked before anything is registered, so a failed registration leaves no trace
+            if Router.is_pattern(path):
+                register_path = Router.mount_path(path)
+                if register_path in self.function_paths:
+                    raise ValueError(f"Route mount '{register_path}' is already a registered path.")
+            else:
+                register_path = path
+                if path in self.routes.mounts:
+                    raise ValueError(f"Path '{path}' is already used to mount routes.")
+
+            handler = RequestHandler(func, self.resolve_params, self.cache, cache_ttl, vary, paginate, self.href, self.metrics, path)
+            if Router.is_pattern(path):
+                self.routes.add(path, handler)
+            else:
+                self.function_paths[path] = handler
+
+            if self.server_destination is not None:
+                self._register_request_path(register_path)
             return func
 
         return decorator
+
+    def _register_request_path(self, path:str):
+        """
+        Registers a path on the server destination, its requests are routed by :meth:`_response_wrapper`.
+        """
+        self.server_destination.register_request_handler(
+            path,
+            response_generator=self._response_wrapper,
+            allow=RNS.Destination.ALLOW_ALL
+        )
     
+    def mount_static(self, mount:str, directory:str, check_interval:float=2, rescan_interval:float | None=None) -> StaticDirectory:
+        """
+        Serves every file under a directory, e.g. "./pages/about.mu" at "/page/docs/about.mu".
+
+        Files are registered as exact paths and served from memory, a changed file is reloaded
+        on its next request (checked at most every check_interval seconds). New files are picked
+        up by :meth:`rescan_static`, or automatically every rescan_interval seconds if given.
+        A file whose path already has a handler is skipped with a warning.
+
+        :param mount: Request path to serve the directory under.
+        :type mount: str
+        :param directory: Directory on disk holding the files.
+        :type directory: str
+        :param check_interval: Seconds between modification checks of a file, defaults to 2.
+        :type check_interval: float
+        :param rescan_interval: Seconds between automatic rescans of the directory while the app runs, defaults to None (manual).
+        :type rescan_interval: float, optional
+        :return: The mounted directory.
+        :rtype: StaticDirectory
+        """
+        static = StaticDirectory(mount, directory, check_interval)
+        self.static_dirs.append(static)
+        self._register_static(static)
+
+        if rescan_interval is not None:
+            self.schedule(f"static {static.mount}", lambda: self._register_static(static), rescan_interval)
+
+        return static
+
+    def rescan_static(self):
+        """
+        Registers files added to (and drops files removed from) every mounted static directory.
+        """
+        for static in self.static_dirs:
+            self._register_static(static)
+
+    def _register_static(self, static:StaticDirectory):
+        """
+        Syncs the registered request handlers with the files currently in a static directory.
+        """
+        added, removed = static.scan()
+
+        def serve(path):
+            response = static.get(path.partition("`")[0])
+            if response is None:
+                return self._error_response(f"Page '{path}' not found.")
+            return response
+
+        for path in added:
+            if Router.is_pattern(path) or "*" in path or "`" in path:
+                RNS.log(f"Not serving static file '{path}', its name isn't a valid request path", RNS.LOG_WARNING)
+                continue
+            if path in self.function_paths or path in self.routes.mounts:
+                RNS.log(f"Not serving static file '{path}', the path already has a handler", RNS.LOG_WARNING)
+                continue
+            self.request_handler(path)(serve)
+            self.static_handlers[path] = self.function_paths[path]
+
+        for path in removed:
+            handler = self.static_handlers.pop(path, None)
+            # The path may have been taken over by a handler registered since
+            if handler is not None and self.function_paths.get(path) is handler:
+                del self.function_paths[path]
+                if self.server_destination is not None:
+                    self.server_destination.deregister_request_handler(path)
+
     def delivery_callback(self, func):
         """
         Decorator to register a callback for LXMF message delivery.
 
+        Coroutine functions (async def) are scheduled on the app's event loop
+        instead of running inside the router's delivery thread.
+
+        If the app has a pipeline, messages are queued onto it and processed in
+        parallel across authors, in order for each author (async callbacks included).
+
         :param func: The callback function to handle delivered messages.
         :type func: callable
         :return: Decorated function.
         :rtype: callable
         """
-        def wrapper(lxmessage: LXMF.LXMessage): 
+        is_async = inspect.iscoroutinefunction(func)
+
+        def process(lxmessage: LXMF.LXMessage, wait:bool):
             assert not self.source is None, "Failed to register identity"
 
-            message = Message(lxmessage, self.router, self.source, self.get_name)
-            return func(message)
-        self.router.register_delivery_callback(wrapper)
+            started = time.perf_counter()
+            message = Message(lxmessage, self.router, self.source, self.get_display_name, self.get_author(lxmessage.source_hash))
+            if is_async:
+                future = self._submit(func(message))
+                future.add_done_callback(log_failure)
+                if self.metrics is not None:
+                    future.add_done_callback(lambda future: self._record_delivery(started, future.cancelled() or future.exception() is not None))
+                # Pipeline workers wait so the author's next message isn't started early
+                return future.result() if wait else None
+
+            if self.metrics is None:
+                return func(message)
+            try:
+                result = func(message)
+            except Exception:
+                self._record_delivery(started, True)
+                raise
+            self._record_delivery(started)
+            return result
+
+        def wrapper(lxmessage: LXMF.LXMessage): 
+            if self.pipeline is None:
+                return process(lxmessage, False)
+            self.pipeline.submit(lxmessage.source_hash, lambda: process(lxmessage, True))
+
+        self.delivery_wrapper = wrapper
+        if self.router is not None:
+            self.router.register_delivery_callback(wrapper)
         return func
-        
-    def run(self):
+
+    def _record_delivery(self, started:float, failed:bool=False):
+        """
+        Records a processed inbound message and how long its callback took.
+        """
+        self.metrics.inc("deliveries_total")
+        self.metrics.observe("delivery_seconds", time.perf_counter() - started)
+        if failed:
+            self.metrics.inc("delivery_errors_total")
+
+    def serve_metrics(self, path:str="/page/metrics.mu"):
+        """
+        Serves a page summarising the app's metrics.
+
+        :param path: The request path of the page, defaults to "/page/metrics.mu".
+        :type path: str
+        """
+        assert self.metrics is not None, "The app was created without metrics."
+
+        @self.request_handler(path)
+        def metrics_page():
+            return self.metrics.page().build()
+
+    def schedule(self, name:str, func, interval:float, jitter:float=0.1):
+        """
+        Runs func every interval seconds (randomly spread by jitter) while the app runs, e.g. for maintenance.
+
+        :param name: Unique name of the job.
+        :type name: str
+        :param func: Called every interval, exceptions are logged.
+        :type func: callable
+        :param interval: Seconds between runs.
+        :type interval: float
+        :param jitter: Fraction of the interval runs are randomly spread by, defaults to 0.1.
+        :type jitter: float
+        """
+        self.scheduler.add(self._job_name(name), func, interval, jitter)
+
+    def announce_now(self):
         """
-        Runs the application, announcing destinations periodically.
+        Announces both destinations right away and resets the announce backoff, e.g. after changing the display name.
+        """
+        self.announcer.trigger()
+        self.scheduler.trigger(self._job_name("announce"))
+
+    def stop(self):
+        """
+        Stops the scheduler, finishes queued requests and messages and flushes buffered state to disk.
+        Called automatically when the interpreter exits.
 
-        Logs destination hashes and announces the server and source destinations
-        every 5 minutes.
+        A hosted app only stops its own jobs and workers, the shared scheduler and names store are stopped by the host.
+        """
+        if self.stopped:
+            return
+        self.stopped = True
+
+        if self.host is None:
+            self.scheduler.stop()
+        else:
+            for name in list(self.scheduler.jobs):
+                if name.startswith(self._job_name("")):
+                    self.scheduler.remove(name)
+        if self.pool is not None:
+            self.pool.stop()
+        if self.pipeline is not None:
+            self.pipeline.stop()
+        if self.outbox is not None:
+            self.outbox.close()
+        # Only the private loop is stopped, a run_async loop belongs to its caller
+        if self.loop_thread is not None:
+            self.loop_thread.stop()
+        if self.host is None and self.names is not None:
+            self.names.close()
+        if self.metrics is not None:
+            self.metrics.stop()
+
+    def _log_destinations(self):
+        """
+        Logs the destination hashes users need to reach the app.
         """
         assert not self.source is None, "Failed to register identity"
 
         RNS.log("Server destination hash: " + RNS.prettyhexrep(self.server_destination.hash))
         RNS.log("Delivery destination hash: " + RNS.prettyhexrep(self.source.hash))
+        
+    def run(self):
+        """
+        Runs the application until :meth:`stop` is called (or Ctrl+C), announcing destinations and running maintenance jobs.
 
-        while True:
-            self.server_destination.announce(app_data=self.app_name.encode("utf-8"))
-            self.router.announce(self.source.hash)
-            time.sleep(self.announce)
+        Logs destination hashes, then announces the server and source destinations
+        with a jittered interval that backs off while their app data stays the same.
+        """
+        assert self.host is None, "Hosted apps are run by their host."
+        self._setup()
+        self._log_destinations()
+
+        try:
+            self.scheduler.run()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def start(self):
+        """
+        Starts announcing and running maintenance jobs in the background, returning straight away.
+        """
+        assert self.host is None, "Hosted apps are started by their host."
+        self._setup()
+        self._log_destinations()
+        self.scheduler.start()
+
+    async def run_async(self):
+        """
+        Async version of :meth:`run`, announcing from a task on the running event loop.
+
+        Coroutine request handlers and delivery callbacks are run on this same loop,
+        so they can share clients and state with the rest of an asyncio program.
+        """
+        with self.loop_lock:
+            assert self.loop is None or self.loop_thread is None, "Async handlers already started on a private loop."
+            self.loop = asyncio.get_running_loop()
+
+        assert self.host is None, "Hosted apps are run by their host."
+        self._setup()
+        self._log_destinations()
+
+        try:
+            await asyncio.to_thread(self.scheduler.run)
+        finally:
+            # Off the loop, pipeline workers may be waiting on coroutines that need it to finish
+            await asyncio.to_thread(self.stop)
 
 if __name__ == "__main__":
     app = LXMFApp("test")
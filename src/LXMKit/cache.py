@@ -0,0 +1,187 @@
+import time, threading
+from collections import OrderedDict
+
+class LRUCache:
+    """
+    Small thread safe least-recently-used mapping with hit/miss counters.
+
+    :param max_entries: Maximum number of entries kept, defaults to 1024.
+    :type max_entries: int
+    """
+    def __init__(self, max_entries:int=1024):
+        assert max_entries > 0, "Cache must hold at least one entry."
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """
+        Returns the value for key (marking it recently used), or default.
+        """
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """
+        Stores a value, evicting the least recently used entries if full.
+        """
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """
+        Removes and returns the value for key, or default.
+        """
+        with self.lock:
+            return self.entries.pop(key, default)
+
+    def clear(self):
+        """
+        Removes every entry.
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    @property
+    def stats(self) -> dict:
+        """
+        Hit and miss counters along with the current size.
+
+        :rtype: dict
+        """
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+class ResponseCache:
+    """
+    Bounded LRU cache of rendered responses with per-entry TTL expiry.
+
+    Entries are keyed by the request path plus a normalized "variant" made from whatever
+    the handler varies on (e.g. its params), so identical requests skip the handler entirely.
+
+    :param max_entries: Maximum number of responses kept before the least recently used is evicted, defaults to 1024.
+    :type max_entries: int
+    """
+    def __init__(self, max_entries:int=1024):
+        assert max_entries > 0, "Cache must hold at least one entry."
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize(values:dict | None) -> tuple:
+        """
+        Turns a params style dict into a stable, hashable variant.
+        """
+        if not values:
+            return ()
+        return tuple(sorted((str(k), str(v)) for (k, v) in values.items()))
+
+    def get(self, path:str, variant:tuple=()) -> bytes | None:
+        """
+        Returns the cached response, or None if missing or expired.
+        """
+        key = (path, variant)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, response = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def put(self, path:str, variant:tuple, response:bytes, ttl:float):
+        """
+        Stores a response for ttl seconds, evicting the least recently used entries if full.
+        """
+        key = (path, variant)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, response)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, path:str, params:dict | None=None) -> int:
+        """
+        Removes cached responses for a path.
+
+        :param path: The request path to invalidate.
+        :type path: str
+        :param params: If provided, only the entry for these params is removed, otherwise every variant of the path is.
+        :type params: dict, optional
+        :return: Number of entries removed.
+        :rtype: int
+        """
+        with self.lock:
+            if params is not None:
+                variant = self.normalize(params)
+                keys = [key for key in self.entries if key[0] == path and ("params", variant) in key[1]]
+            else:
+                keys = [key for key in self.entries if key[0] == path]
+
+            for key in keys:
+                del self.entries[key]
+            return len(keys)
+
+    def clear(self):
+        """
+        Removes every cached response.
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def purge_expired(self) -> int:
+        """
+        Drops expired entries, returning how many were removed.
+        """
+        now = time.monotonic()
+        with self.lock:
+            keys = [key for (key, (expires_at, _)) in self.entries.items() if expires_at < now]
+            for key in keys:
+                del self.entries[key]
+            return len(keys)
+
+    @property
+    def stats(self) -> dict:
+        """
+        Hit, miss and eviction counters along with the current size.
+
+        :rtype: dict
+        """
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
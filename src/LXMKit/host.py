@@ -0,0 +1,177 @@
+from __future__ import annotations
+import os, atexit, asyncio, threading
+from .app import LXMFApp, AnnounceHandler
+from .names import NameStore
+from .metrics import Metrics
+from .scheduler import Scheduler
+from .lazy import lazy_import
+
+RNS = lazy_import("RNS")
+
+class Host:
+    """
+    Runs many apps (e.g. a fleet of small bots) in one process.
+
+    Reticulum can only be started once per process, so apps that should run side by side
+    are mounted on a host instead. The host owns the Reticulum instance (interfaces and
+    path tables), the names store, a single announce handler and the scheduler, and each
+    app keeps its own identity, destinations, handlers and announce schedule.
+
+    Every app still has its own LXMF router, as a router only supports a single delivery
+    identity, so inbound messages are demultiplexed by their destination hash to the app
+    whose router owns it. Each app is stored in a sub directory of storage_path named after it.
+
+    :param storage_path: Path of the Reticulum config, names store and app directories, defaults to "./lxmf".
+    :type storage_path: str
+    :param names_ttl: Seconds before names of peers that stopped announcing are forgotten, None to keep forever, defaults to 30 days.
+    :type names_ttl: float, optional
+    :param metrics: Registry recording announces, names store and scheduler metrics, defaults to None (disabled).
+    :type metrics: Metrics, optional
+    """
+    # Seconds between expiry and compaction passes over the names store
+    NAMES_MAINTENANCE_INTERVAL = 3600
+    # Entries Reticulum and the host keep in storage_path, apps can't be named after them
+    RESERVED_NAMES = ("config", "storage", "interfaces", "logfile", "names")
+
+    def __init__(self, storage_path:str="./lxmf", names_ttl:float | None=30*24*3600, metrics:Metrics | None=None):
+        self.storage_path = storage_path
+        self.metrics = metrics
+        self.apps:dict[bytes, LXMFApp] = {}
+        self.lock = threading.Lock()
+        self.stopped = False
+
+        self.rns = RNS.Reticulum(storage_path)
+        self.names = NameStore(os.path.join(storage_path, "names"), ttl=names_ttl, maintenance_interval=None, metrics=metrics)
+        self.scheduler = Scheduler()
+        self.scheduler.add("names", self.names.maintain, self.NAMES_MAINTENANCE_INTERVAL)
+        if metrics is not None:
+            metrics.collect("names", lambda: self.names.stats)
+            metrics.collect("scheduler", lambda: self.scheduler.stats)
+            metrics.collect("apps", lambda: {"mounted": len(self.apps)})
+
+        RNS.Transport.register_announce_handler(AnnounceHandler("lxmf.delivery", self._on_lxmf_announce_received))
+        atexit.register(self.stop)
+
+    def add(self, app_name:str, **kwargs) -> LXMFApp:
+        """
+        Creates an app mounted on the host.
+
+        :param app_name: Name of the app, also the name of its storage directory.
+        :type app_name: str
+        :param kwargs: Any other :class:`LXMFApp` parameters, e.g. announce or pool.
+        :return: The app, register its handlers as usual.
+        :rtype: LXMFApp
+        :raises ValueError: If app_name can't name a directory of its own in storage_path, or is already hosted.
+        """
+        assert not "storage_path" in kwargs, "Hosted apps are stored in the host's storage path."
+        if app_name in ("", ".", "..") or any(separator in app_name for separator in ("/", "\\", "\0")):
+            raise ValueError(f"App name '{app_name}' can't be used as a directory name.")
+        # Compared case insensitively, as names differing in case share a directory on some file systems
+        if app_name.lower() in self.RESERVED_NAMES:
+            raise ValueError(f"App name '{app_name}' is reserved for the host's own storage.")
+        with self.lock:
+            if any(app.app_name.lower() == app_name.lower() for app in self.apps.values()):
+                raise ValueError(f"An app named '{app_name}' is already hosted.")
+
+        app = LXMFApp(app_name, storage_path=os.path.join(self.storage_path, app_name), host=self, **kwargs)
+        with self.lock:
+            self.apps[app.source.hash] = app
+        return app
+
+    def get(self, destination_hash:bytes) -> LXMFApp | None:
+        """
+        Returns the app an inbound message or request for destination_hash belongs to.
+
+        :param destination_hash: A delivery or server destination hash.
+        :type destination_hash: bytes
+        :rtype: LXMFApp | None
+        """
+        with self.lock:
+            app = self.apps.get(destination_hash)
+            if app is not None:
+                return app
+            for app in self.apps.values():
+                if app.server_destination.hash == destination_hash:
+                    return app
+        return None
+
+    def _on_lxmf_announce_received(self, aspect, destination_hash, announced_identity:RNS.Identity, app_data, announce_packet_hash):
+        """
+        Stores the announced name once and drops the cached author from every app.
+        """
+        self.names.put(destination_hash, app_data)
+        with self.lock:
+            apps = list(self.apps.values())
+        for app in apps:
+            # The announce may carry a new identity/ratchet, rebuild the author on next use
+            app.authors.pop(destination_hash)
+        if self.metrics is not None:
+            self.metrics.inc("announces_total")
+
+    def _log_destinations(self):
+        with self.lock:
+            apps = list(self.apps.values())
+        for app in apps:
+            RNS.log(f"Hosting {app.app_name}")
+            app._log_destinations()
+
+    def run(self):
+        """
+        Runs every app until :meth:`stop` is called (or Ctrl+C), announcing destinations and running maintenance jobs.
+        """
+        self._log_destinations()
+
+        try:
+            self.scheduler.run()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def start(self):
+        """
+        Starts every app in the background, returning straight away.
+        """
+        self._log_destinations()
+        self.scheduler.start()
+
+    async def run_async(self):
+        """
+        Async version of :meth:`run`.
+        """
+        self._log_destinations()
+
+        try:
+            await asyncio.to_thread(self.scheduler.run)
+        finally:
+            # Off the loop, pipeline workers may be waiting on coroutines that need it to finish
+            await asyncio.to_thread(self.stop)
+
+    def stop(self):
+        """
+        Stops the scheduler and every app, then flushes the names store to disk.
+        Called automatically when the interpreter exits.
+        """
+        if self.stopped:
+            return
+        self.stopped = True
+
+        self.scheduler.stop()
+        with self.lock:
+            apps = list(self.apps.values())
+        for app in apps:
+            app.stop()
+        self.names.close()
+        if self.metrics is not None:
+            self.metrics.stop()
+
+    @property
+    def stats(self) -> dict:
+        """
+        Names of the hosted apps by delivery destination hash, along with the scheduler's job stats.
+
+        :rtype: dict
+        """
+        with self.lock:
+            apps = {RNS.prettyhexrep(destination_hash): app.app_name for (destination_hash, app) in self.apps.items()}
+        return {"apps": apps, "jobs": self.scheduler.stats}
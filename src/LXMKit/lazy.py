@@ -0,0 +1,30 @@
+import sys, importlib.util
+
+def lazy_import(name:str):
+    """
+    Returns a module that is only loaded when one of its attributes is first used.
+
+    Lets modules import RNS, LXMF and lmdb at the top as usual, while processes that only
+    define handlers or render pages never pay for loading them. A module that is already
+    loaded (or already lazily imported) is returned as is.
+
+    :param name: Name of the module, e.g. "RNS".
+    :type name: str
+    :return: The (lazily loaded) module.
+    :rtype: module
+    :raises ModuleNotFoundError: If the module isn't installed.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,279 @@
+import os, time, bisect, threading
+from .mu import Micron, Header, Div, Paragraph, escape, FOREGROUND_GREY
+from .lazy import lazy_import
+
+RNS = lazy_import("RNS")
+
+# Upper bounds of the latency buckets in seconds, from a fast cache hit to a slow LoRa send
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class Histogram:
+    """
+    Counts observations into fixed buckets, along with their sum.
+
+    :param buckets: Sorted upper bounds of the buckets, an implicit +Inf bucket follows the last one.
+    :type buckets: tuple
+    """
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets:tuple=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value:float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q:float) -> float:
+        """
+        Estimates a quantile as the upper bound of the bucket it falls in (the largest bound for the +Inf bucket).
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for (i, count) in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[min(i, len(self.buckets) - 1)]
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        return {
+            "buckets": dict(zip(self.buckets + (float("inf"),), self.counts)),
+            "sum": self.sum,
+            "count": self.count,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+        }
+
+def _labels(labels:tuple) -> str:
+    """
+    Formats label pairs the way the Prometheus text format expects them.
+    """
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for (_, value) in labels)
+    return "{" + ",".join(f'{name}="{value}"' for ((name, _), value) in zip(labels, escaped)) + "}"
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metrics:
+    """
+    Counters and latency histograms, labelled per path (or method), for an app.
+
+    Instrumented code only touches the registry when the app was given one, so an app
+    without metrics pays a single None check per request or message.
+
+    Besides the recorded values, collectors can be registered to export the stats of
+    other components (cache, pool, names store...) as gauges when a snapshot is taken.
+    Everything can be read from Python with snapshot(), as Prometheus text with
+    prometheus(), written to a file for the node exporter's textfile collector with
+    dump(), or served as a micron page with page().
+
+    :param buckets: Upper bounds of the latency buckets in seconds, defaults to DEFAULT_BUCKETS.
+    :type buckets: tuple
+    :param dump_path: File the Prometheus text is written to every dump_interval seconds, defaults to None (no dumps).
+    :type dump_path: str, optional
+    :param dump_interval: Seconds between dumps, defaults to 15.
+    :type dump_interval: float
+    :param prefix: Prefix of every exported metric name, defaults to "lxmkit".
+    :type prefix: str
+    """
+    def __init__(self, buckets:tuple=DEFAULT_BUCKETS, dump_path:str | None=None, dump_interval:float=15, prefix:str="lxmkit"):
+        assert list(buckets) == sorted(buckets), "Histogram buckets must be sorted."
+
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = {}
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self.stopped = threading.Event()
+        self.thread = None
+        if dump_path is not None:
+            self.thread = threading.Thread(target=self._dump_loop, daemon=True)
+            self.thread.start()
+
+    def inc(self, name:str, value:float=1, **labels):
+        """
+        Adds value to a counter.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name:str, seconds:float, **labels):
+        """
+        Records a duration in a histogram.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def collect(self, name:str, stats):
+        """
+        Registers a function returning a dict of numbers, exported as gauges named prefix_name_key.
+
+        :param name: Name of the component, e.g. "cache".
+        :type name: str
+        :param stats: Callable returning the component's stats dict.
+        :type stats: callable
+        """
+        self.collectors[name] = stats
+
+    def _gauges(self) -> dict:
+        gauges = {}
+        for (name, stats) in list(self.collectors.items()):
+            try:
+                values = stats()
+            except Exception as e:
+                RNS.log(f"Failed to collect {name} metrics: {e}", RNS.LOG_ERROR)
+                continue
+            for (key, value) in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    gauges[f"{name}_{key}"] = value
+        return gauges
+
+    def snapshot(self) -> dict:
+        """
+        Returns every counter, histogram and collected gauge.
+
+        Counters and histograms are keyed by name, then by their label tuple, e.g.
+        ``snapshot()["histograms"]["request_seconds"][(("path", "/page/index.mu"),)]["p99"]``.
+
+        :rtype: dict
+        """
+        counters = {}
+        histograms = {}
+        with self.lock:
+            for ((name, labels), value) in self.counters.items():
+                counters.setdefault(name, {})[labels] = value
+            for ((name, labels), histogram) in self.histograms.items():
+                histograms.setdefault(name, {})[labels] = histogram.snapshot()
+
+        return {
+            "uptime": time.time() - self.started_at,
+            "counters": counters,
+            "histograms": histograms,
+            "gauges": self._gauges(),
+        }
+
+    def prometheus(self) -> str:
+        """
+        Renders the metrics in the Prometheus text exposition format.
+
+        :rtype: str
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        for (name, series) in sorted(snapshot["counters"].items()):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} counter")
+            for (labels, value) in sorted(series.items()):
+                lines.append(f"{metric}{_labels(labels)} {_number(value)}")
+
+        for (name, series) in sorted(snapshot["histograms"].items()):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            for (labels, histogram) in sorted(series.items()):
+                cumulative = 0
+                for (bound, count) in histogram["buckets"].items():
+                    cumulative += count
+                    lines.append(f"{metric}_bucket{_labels(labels + (('le', _number(bound)),))} {cumulative}")
+                lines.append(f"{metric}_sum{_labels(labels)} {_number(histogram['sum'])}")
+                lines.append(f"{metric}_count{_labels(labels)} {histogram['count']}")
+
+        for (name, value) in sorted(snapshot["gauges"].items()):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {_number(value)}")
+
+        lines.append(f"# TYPE {self.prefix}_uptime_seconds gauge")
+        lines.append(f"{self.prefix}_uptime_seconds {_number(snapshot['uptime'])}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, file_path:str | None=None):
+        """
+        Writes the Prometheus text to a file, replacing it atomically so scrapers never see half a file.
+
+        :param file_path: Where to write, defaults to dump_path.
+        :type file_path: str, optional
+        """
+        file_path = file_path or self.dump_path
+        assert file_path is not None, "No file to dump metrics to."
+
+        temporary = f"{file_path}.tmp"
+        with open(temporary, "w") as f:
+            f.write(self.prometheus())
+        os.replace(temporary, file_path)
+
+    def _dump_loop(self):
+        while not self.stopped.wait(self.dump_interval):
+            try:
+                self.dump()
+            except Exception as e:
+                RNS.log(f"Failed to dump metrics to {self.dump_path}: {e}", RNS.LOG_ERROR)
+
+    def stop(self):
+        """
+        Stops periodic dumps, writing one last time.
+        """
+        if self.thread is None or self.stopped.is_set():
+            return
+        self.stopped.set()
+        self.thread.join()
+        self.dump()
+
+    def page(self) -> Micron:
+        """
+        Renders a summary of requests per path, the other histograms and the gauges as a micron page.
+
+        :rtype: Micron
+        """
+        snapshot = self.snapshot()
+        requests = snapshot["counters"].get("requests_total", {})
+        errors = snapshot["counters"].get("request_errors_total", {})
+
+        def describe(labels):
+            return escape(", ".join(str(value) for (_, value) in labels) or "all")
+
+        sections = [Paragraph(f"Up for {int(snapshot['uptime'])}s", style=[FOREGROUND_GREY])]
+        for (name, series) in sorted(snapshot["histograms"].items()):
+            lines = []
+            for (labels, histogram) in sorted(series.items()):
+                line = f"{describe(labels)}: {histogram['count']}"
+                if name == "request_seconds":
+                    line += f" requests, {int(errors.get(labels, 0))} errors"
+                line += f", avg {1000 * histogram['sum'] / max(histogram['count'], 1):.1f}ms"
+                line += f", p50 {1000 * histogram['p50']:g}ms, p99 {1000 * histogram['p99']:g}ms"
+                lines.append(Paragraph(line))
+            sections.append(Header(name, [Div(lines)]))
+
+        other = [
+            Paragraph(f"{name}{'' if not labels else ' (' + describe(labels) + ')'}: {value:,}")
+            for (name, series) in sorted(snapshot["counters"].items()) if series is not requests
+            for (labels, value) in sorted(series.items())
+        ]
+        if other:
+            sections.append(Header("counters", [Div(other)]))
+
+        gauges = [Paragraph(f"{name}: {value:,}" if isinstance(value, int) else f"{name}: {value:.4g}") for (name, value) in sorted(snapshot["gauges"].items())]
+        if gauges:
+            sections.append(Header("components", [Div(gauges)]))
+
+        return Micron([Header("Metrics", sections)])
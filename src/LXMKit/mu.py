@@ -36,98 +36,324 @@ UNDERLINE = 'underline'
 
 LINE_STYLES = [CENTER, LEFT, RIGHT, RESET]
 
-def apply_styles(text, styles, reset=True):
+# Request variable carrying the page number of a paginated page
+PAGE_VARIABLE = 'page'
+
+# Interned style tuples and their rendered affixes, bounded so dynamic styles can't grow them forever
+STYLE_CACHE_SIZE = 4096
+_styles = {}
+_affixes = {}
+_span_styles = {}
+
+def normalize_style(style):
+    """
+    Returns the interned tuple for a style list, equal styles share one object and one cache entry.
+    """
+    if not style:
+        return ()
+
+    key = style if type(style) is tuple else tuple(style)
+    interned = _styles.get(key)
+    if interned is None:
+        interned = key
+        if len(_styles) < STYLE_CACHE_SIZE:
+            _styles[key] = key
+    return interned
+
+def _compute_affixes(styles, reset):
     if styles is None:
-        return text + ('`f' if reset else '') + ('`b' if reset else '')
-    
-    line_styles = [s for s in styles if s in LINE_STYLES]
-    inline_styles = [s for s in styles if s not in LINE_STYLES]
-    line_prefix = ''.join('`' + s for s in line_styles)
-    result = text
-    for style in inline_styles:
+        return '', ('`f' if reset else '') + ('`b' if reset else '')
+
+    line_prefix = ''.join('`' + s for s in styles if s in LINE_STYLES)
+    opening = ''
+    closing = ''
+    for style in styles:
+        if style in LINE_STYLES:
+            continue
         if style.startswith('F'):
-            result = '`' + style + result + ('`f' if reset else '') 
+            opening = '`' + style + opening
+            closing = closing + ('`f' if reset else '')
         elif style.startswith('B'):
-            result = '`' + style + result + ('`b' if reset else '')
+            opening = '`' + style + opening
+            closing = closing + ('`b' if reset else '')
         elif style == BOLD:
-            result = '`!' + result + '`!'
+            opening = '`!' + opening
+            closing = closing + '`!'
         elif style == ITALIC:
-            result = '`*' + result + '`*'
+            opening = '`*' + opening
+            closing = closing + '`*'
         elif style == UNDERLINE:
-            result = '`_' + result + '`_'
-    return line_prefix + result
+            opening = '`_' + opening
+            closing = closing + '`_'
+    return line_prefix + opening, closing
+
+def style_affixes(styles, reset=True):
+    """
+    Returns the (prefix, suffix) pair that apply_styles would wrap around any text.
+    """
+    key = (styles if styles is None or type(styles) is tuple else tuple(styles), reset)
+    affixes = _affixes.get(key)
+    if affixes is None:
+        affixes = _compute_affixes(key[0], reset)
+        if len(_affixes) < STYLE_CACHE_SIZE:
+            _affixes[key] = affixes
+    return affixes
+
+def apply_styles(text, styles, reset=True):
+    prefix, suffix = style_affixes(styles, reset)
+    return prefix + text + suffix
+
+def escape(text):
+    """
+    Escapes micron control characters so text is displayed as-is.
+    """
+    return text.replace('\\', '\\\\').replace('`', '\\`')
 
 class Element:
+    __slots__ = ("subnodes", "_style")
+
     def __init__(self, subnodes=None, style=None):
         self.subnodes = subnodes or []
-        self.style = style or []
-
-    def render(self, indent=0, parent_style=[]):
-        raise NotImplementedError
+        self.style = style
+
+    @property
+    def style(self):
+        """
+        Styles of the element as an interned tuple. Assign a new list (or tuple) to change them.
+        """
+        return self._style
+
+    @style.setter
+    def style(self, style):
+        self._style = normalize_style(style)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "write" in cls.__dict__:
+            # render() and iter_render() keep using the class's own writer, even where write is replaced below
+            cls._write = cls.__dict__["write"]
+        elif "render" in cls.__dict__ or "iter_render" in cls.__dict__:
+            # Subclasses of a built-in element that only override render() or iter_render() are rendered through them in a tree
+            cls.write = Element.write
+
+    def write(self, out, indent=0, parent_style=()):
+        """
+        Appends the rendered micron fragments to the list out.
+        """
+        # Elements that only implement render() or iter_render() can still be part of a tree
+        if type(self).render is not Element.render:
+            out.append(self.render(indent, parent_style))
+        elif type(self).iter_render is not Element.iter_render:
+            out.extend(self.iter_render(indent, parent_style))
+        else:
+            raise NotImplementedError
+
+    _write = write
+
+    def render(self, indent=0, parent_style=()):
+        out = []
+        self._write(out, indent, normalize_style(parent_style))
+        return ''.join(out)
+
+    def iter_render(self, indent=0, parent_style=()):
+        """
+        Yields the rendered micron as string fragments, joining them gives render().
+        """
+        out = []
+        self._write(out, indent, normalize_style(parent_style))
+        yield from out
 
 class Micron(Element):
+    __slots__ = ()
+
+    FOOTER = "\n# Made using LXMKit"
+
     def render(self, indent=0):
-        return '\n'.join(subnode.render(indent) for subnode in self.subnodes)
+        return ''.join(self.iter_render(indent))
+
+    def write(self, out, indent=0, parent_style=()):
+        for (i, subnode) in enumerate(self.subnodes):
+            if i:
+                out.append('\n')
+            subnode.write(out, indent)
+
+    def iter_render(self, indent=0, parent_style=()):
+        # Top level elements are rendered one at a time so large pages stream
+        for (i, subnode) in enumerate(self.subnodes):
+            out = ['\n'] if i else []
+            subnode.write(out, indent)
+            yield from out
 
     def build(self):
-        return (self.render() + "\n# Made using LXMKit").encode("utf-8")
+        return (self.render() + self.FOOTER).encode("utf-8")
+
+    def compile(self):
+        """
+        Renders the static parts of the page once, leaving Slot elements to be filled per request.
+
+        :return: A template whose build(**values) matches build() of the same tree with the slots filled in.
+        :rtype: Template
+        """
+        segments = []
+        slots = []
+        pending = []
+        for fragment in self.iter_render():
+            if isinstance(fragment, SlotValue):
+                segments.append(''.join(pending).encode("utf-8"))
+                slots.append((fragment.name, fragment.encode("utf-8")))
+                pending = []
+            else:
+                pending.append(fragment)
+        pending.append(self.FOOTER)
+        segments.append(''.join(pending).encode("utf-8"))
+        return Template(segments, slots)
+
+    def iter_build(self, chunk_size=4096):
+        """
+        Yields the same bytes as build() in chunks of roughly chunk_size bytes.
+        """
+        pending = []
+        size = 0
+        for fragment in self.iter_render():
+            pending.append(fragment)
+            size += len(fragment)
+            if size >= chunk_size:
+                yield ''.join(pending).encode("utf-8")
+                pending = []
+                size = 0
+        pending.append(self.FOOTER)
+        yield ''.join(pending).encode("utf-8")
+
+    def paginate(self, budget, href="", variable=PAGE_VARIABLE):
+        """
+        Splits the page into pages of at most budget bytes each (footer and navigation included).
+
+        Pages break between top level elements. A Header or Div too large for one page is
+        split between its own subnodes, and repeated (same content and style) around each
+        part so headers and styles stay intact on every page. Every page but a single one
+        ends with previous/next links to href with the page number in variable, on an unstyled line.
+
+        An element that can't be split any further and is still larger than budget gets a
+        page of its own.
+
+        :param budget: Largest size of a page in bytes, e.g. the MDU of a link.
+        :type budget: int
+        :param href: Link target of the page, e.g. "/page/index.mu".
+        :type href: str
+        :param variable: Name of the request variable holding the page number, defaults to "page".
+        :type variable: str
+        :return: Encoded pages, the first one is page 1.
+        :rtype: list
+        """
+        if len(self.build()) <= budget:
+            return [self.build()]
+
+        # Reserve room for the navigation of a page with large page numbers
+        footer = len(self.FOOTER.encode("utf-8"))
+        available = budget - footer - _rendered_size(_page_navigation(href, variable, 9998, 9999)) - 1
+
+        # Top level elements render independently, so a page is the sum of its pieces and their newlines
+        pages = []
+        page = []
+        used = 0
+        for subnode in self.subnodes:
+            for piece in _split(subnode, available, 0):
+                size = _rendered_size(piece) + (1 if page else 0)
+                if page and used + size > available:
+                    pages.append(page)
+                    page = []
+                    size -= 1
+                    used = 0
+                page.append(piece)
+                used += size
+        if page or not pages:
+            pages.append(page)
+
+        return [
+            Micron(page + [_page_navigation(href, variable, number, len(pages))]).build()
+            for (number, page) in enumerate(pages, start=1)
+        ]
 
 class Header(Element):
+    __slots__ = ("content",)
+
     def __init__(self, content, subnodes=None, style=None):
         super().__init__(subnodes, style)
         self.content = content
 
-    def render(self, indent=0, parent_style=[]):
+    def write(self, out, indent=0, parent_style=()):
         level = indent + 1
-        heading = '>' * level + ' ' + apply_styles(self.content, self.style, False)
+        prefix, suffix = style_affixes(self._style, False)
+        out.append('>' * level + ' ' + prefix)
+        out.append(self.content)
+        out.append(suffix + '\n')
 
-        parent_style = parent_style or self.style
-        
-        subcontent = '\n'.join(subnode.render(level, parent_style) for subnode in self.subnodes)
-        return heading + '\n' + subcontent
+        parent_style = parent_style or self._style
+
+        for (i, subnode) in enumerate(self.subnodes):
+            if i:
+                out.append('\n')
+            subnode.write(out, level, parent_style)
 
 class Div(Element):
+    __slots__ = ()
+
     def __init__(self, subnodes=None, style=None):
         super().__init__(subnodes, style)
 
-    def render(self, indent=0, parent_style=[]):
+    def write(self, out, indent=0, parent_style=()):
         level = indent
-        parent_style = parent_style or self.style
+        parent_style = parent_style or self._style
 
-        content = ''
+        prefix, suffix = style_affixes(self._style, False)
+        newline = "\n" + "  " * indent
+        out.append(prefix)
         for subnode in self.subnodes:
             if isinstance(subnode, Hr) or isinstance(subnode, Header):
-                content += "\n" + subnode.render(level, parent_style)
+                out.append("\n")
             else:
-                content += "\n" + "  " * indent + subnode.render(level, parent_style)
-
-        content = apply_styles(content, self.style, False)
+                out.append(newline)
+            subnode.write(out, level, parent_style)
+        out.append(suffix)
 
-        if not self.style == parent_style:
-            content = content + apply_styles("", parent_style, False)
-
-        return content
+        if not self._style == parent_style:
+            out.append(''.join(style_affixes(parent_style, False)))
     
 class Paragraph(Element):
+    __slots__ = ("content",)
+
     def __init__(self, content, style=None):
         super().__init__(style=style)
         self.content = content
 
-    def render(self, indent=0, parent_style=[]):
-        return apply_styles(self.content, self.style)
+    def write(self, out, indent=0, parent_style=()):
+        prefix, suffix = style_affixes(self._style)
+        out.append(prefix)
+        out.append(self.content)
+        out.append(suffix)
 
 class Span(Element):
+    __slots__ = ()
+
     def __init__(self, subnodes=[], style=None):
         super().__init__(subnodes=subnodes, style=style)
 
-    def render(self, indent=0, parent_style=[]):
-        parent_style = parent_style or self.style
+    def write(self, out, indent=0, parent_style=()):
+        parent_style = parent_style or self._style
 
-        parent_style = [i for i in parent_style if i not in LINE_STYLES] + [i for i in self.style if i in LINE_STYLES]
+        key = (parent_style, self._style)
+        span_style = _span_styles.get(key)
+        if span_style is None:
+            span_style = normalize_style([i for i in parent_style if i not in LINE_STYLES] + [i for i in self._style if i in LINE_STYLES])
+            if len(_span_styles) < STYLE_CACHE_SIZE:
+                _span_styles[key] = span_style
         
-        return ''.join(subnode.render(indent, parent_style) for subnode in self.subnodes)
+        for subnode in self.subnodes:
+            subnode.write(out, indent, span_style)
 
 class Input(Element):
+    __slots__ = ("name", "default", "size", "masked")
+
     def __init__(self, name, default="", size=None, masked=False, style=None):
         super().__init__(style=style)
         self.name = name
@@ -135,76 +361,205 @@ class Input(Element):
         self.size = size
         self.masked = masked
 
-    def render(self, indent=0, parent_style=[]):
+    def write(self, out, indent=0, parent_style=()):
         prefix = '`<'
         size_part = f"{self.size}|" if self.size else ""
         masked_part = f"!" if self.masked else ""
         
-        content = apply_styles(f'{prefix}{masked_part}{size_part}{self.name}`{self.default}>', self.style, True)
+        out.append(apply_styles(f'{prefix}{masked_part}{size_part}{self.name}`{self.default}>', self._style, True))
 
-        if not self.style == parent_style:
-            content = content + apply_styles("", parent_style, False)
-    
-        return content
+        if not self._style == parent_style:
+            out.append(''.join(style_affixes(parent_style, False)))
 
 class Checkbox(Element):
+    __slots__ = ("name", "value", "checked")
+
     def __init__(self, name="checkbox", value="1", checked=False):
         super().__init__()
         self.name = name
         self.value = value
         self.checked = checked
 
-    def render(self, indent=0, parent_style=[]):
+    def write(self, out, indent=0, parent_style=()):
         if self.checked:
-            return f'`< ?|{self.name}|{self.value}|*`>'
-        return f'`< ?|{self.name}|{self.value}`>'
+            out.append(f'`< ?|{self.name}|{self.value}|*`>')
+        else:
+            out.append(f'`< ?|{self.name}|{self.value}`>')
 
 class Radio(Element):
+    __slots__ = ("name", "value", "checked")
+
     def __init__(self, name, value, checked=False, style=None):
         super().__init__(style=style)
         self.name = name
         self.value = value
         self.checked = checked
 
-    def render(self, indent=0, parent_style=[]):
+    def write(self, out, indent=0, parent_style=()):
         check_part = '|*' if self.checked else ''
         
         content = f'`<^|{self.name}|{self.value}{check_part}`>'
         
-        content = apply_styles(content, self.style, True)
+        out.append(apply_styles(content, self._style, True))
     
-        if not self.style == parent_style:
-            content = content + apply_styles("", parent_style, False)
-        
-        return content
+        if not self._style == parent_style:
+            out.append(''.join(style_affixes(parent_style, False)))
 
 class Anchor(Element):
+    __slots__ = ("content", "href")
+
     def __init__(self, content, href, style=None):
         super().__init__(style=style)
         self.content = content
         self.href = href
 
-    def render(self, indent=0, parent_style=[]):
-        content =  apply_styles(f'`[{self.content}`{self.href}]', self.style)
-        if not self.style == parent_style:
-            content = content + apply_styles("", parent_style, False)
-        
-        return content
+    def write(self, out, indent=0, parent_style=()):
+        out.append(apply_styles(f'`[{self.content}`{self.href}]', self._style))
+        if not self._style == parent_style:
+            out.append(''.join(style_affixes(parent_style, False)))
     
 class Br(Element):
+    __slots__ = ()
+
     def __init__(self, style=None):
         super().__init__(style=style)
 
-    def render(self, indent=0, parent_style=[]):
-        return ""
+    def write(self, out, indent=0, parent_style=()):
+        out.append("")
     
 class Hr(Element):
+    __slots__ = ("type",)
+
     def __init__(self, style=None, type=""):
         super().__init__(style=style)
         self.type = type
 
-    def render(self, indent=0, parent_style=[]):
-        return apply_styles('-' + self.type, self.style, reset=False)
+    def write(self, out, indent=0, parent_style=()):
+        out.append(apply_styles('-' + self.type, self._style, reset=False))
+
+class SlotValue(str):
+    """
+    Rendered slot text, tagged with the slot name so templates can find it.
+    """
+    def __new__(cls, value, name):
+        instance = super().__new__(cls, value)
+        instance.name = name
+        return instance
+
+class Slot(Element):
+    """
+    Placeholder for a dynamic value in a compiled template.
+
+    Rendered normally it shows its (escaped) default, in a template the value is
+    substituted per request. Styles are applied and reset around the value, so
+    whatever follows the slot keeps the formatting of the surrounding layout.
+    """
+    __slots__ = ("name", "default")
+
+    def __init__(self, name, default="", style=None):
+        super().__init__(style=style)
+        self.name = name
+        self.default = default
+
+    def write(self, out, indent=0, parent_style=()):
+        prefix, suffix = style_affixes(self._style)
+        out.append(prefix)
+        out.append(SlotValue(escape(str(self.default)), self.name))
+        out.append(suffix)
+        if not self._style == parent_style:
+            out.append(''.join(style_affixes(parent_style, False)))
+
+def page_href(href, variable, number):
+    """
+    Adds a page number to a link target, after any variables it already carries.
+    """
+    return f"{href}{'|' if '`' in href else '`'}{variable}={number}"
+
+def _page_navigation(href, variable, number, count):
+    """
+    Builds the previous/next line at the bottom of a paginated page.
+    """
+    # Resets whatever style the page left open (e.g. a styled Div), so the navigation is always plain
+    nodes = [Paragraph("``")]
+    if number > 1:
+        nodes.append(Anchor("< Previous", page_href(href, variable, number - 1)))
+    nodes.append(Paragraph(f"  Page {number} of {count}  "))
+    if number < count:
+        nodes.append(Anchor("Next >", page_href(href, variable, number + 1)))
+    return Span(nodes)
+
+def _rendered_size(element, indent=0, parent_style=()):
+    return len(element.render(indent, parent_style).encode("utf-8"))
+
+def _split(element, budget, indent, parent_style=()):
+    """
+    Splits a Header or Div rendering larger than budget into copies of it each holding part of its subnodes.
+
+    Sizes are measured as rendered in place (indent and inherited style), and every subnode
+    is counted along with the newline its parent writes before it, so each copy holding
+    more than one piece renders to at most budget.
+    """
+    if type(element) not in (Header, Div) or _rendered_size(element, indent, parent_style) <= budget:
+        return [element]
+
+    if type(element) is Header:
+        wrap = lambda subnodes: Header(element.content, subnodes, element.style)
+        child_indent = indent + 1
+        joint = 1
+    else:
+        wrap = lambda subnodes: Div(subnodes, element.style)
+        child_indent = indent
+        joint = 1 + 2 * indent
+    # Subnodes inherit the style as in Header.write and Div.write
+    child_style = parent_style or element.style
+
+    empty = _rendered_size(wrap([]), indent, parent_style)
+    parts = []
+    part = []
+    used = empty
+    for subnode in element.subnodes:
+        for piece in _split(subnode, budget - empty - joint, child_indent, child_style):
+            size = _rendered_size(piece, child_indent, child_style) + joint
+            if part and used + size > budget:
+                parts.append(wrap(part))
+                part = []
+                used = empty
+            part.append(piece)
+            used += size
+    if part:
+        parts.append(wrap(part))
+    return parts
+
+class Template:
+    """
+    Pre-encoded page produced by Micron.compile().
+
+    Holds the static byte segments between slots, so building a page is a byte join
+    of the segments and the escaped slot values.
+
+    :param segments: Encoded static segments, one more than there are slots.
+    :type segments: list
+    :param slots: (name, encoded default) for every slot, in page order.
+    :type slots: list
+    """
+    def __init__(self, segments, slots):
+        assert len(segments) == len(slots) + 1, "Template needs a segment either side of every slot."
+        self.segments = segments
+        self.slots = slots
+        self.names = frozenset(name for (name, _) in slots)
+
+    def build(self, **values):
+        """
+        Fills the slots and returns the page bytes.
+        """
+        assert self.names.issuperset(values), f"Unknown slots: {', '.join(set(values) - self.names)}"
+
+        parts = [self.segments[0]]
+        for ((name, default), segment) in zip(self.slots, self.segments[1:]):
+            value = values.get(name)
+            parts.append(default if value is None else escape(str(value)).encode("utf-8"))
+            parts.append(segment)
+        return b''.join(parts)
 
 if __name__ == "__main__":
     canvas = Micron([
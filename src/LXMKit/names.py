@@ -0,0 +1,403 @@
+from __future__ import annotations
+import os, time, struct, shutil, threading
+from .cache import LRUCache
+from .metrics import Metrics
+from .lazy import lazy_import
+
+RNS = lazy_import("RNS")
+lmdb = lazy_import("lmdb")
+
+_MISSING = object()
+
+def decode_display_name(app_data:bytes | None) -> str | None:
+    """
+    Decodes the display name from announced LXMF app data, removing unprintable characters.
+
+    Understands both the original format (the raw name) and the msgpack list sent by
+    LXMF 0.5.0 and newer, where the name is the first element.
+
+    :param app_data: The announced app data.
+    :type app_data: bytes | None
+    :return: The display name, or None if there isn't one.
+    :rtype: str | None
+    """
+    if not app_data:
+        return None
+
+    name = app_data
+    if 0x90 <= app_data[0] <= 0x9f or app_data[0] == 0xdc:
+        try:
+            peer_data = RNS.vendor.umsgpack.unpackb(app_data)
+        except Exception:
+            peer_data = None
+        if isinstance(peer_data, list):
+            name = peer_data[0] if len(peer_data) > 0 else None
+
+    if isinstance(name, bytes):
+        name = name.decode("utf-8", errors="ignore")
+    if not isinstance(name, str):
+        return None
+
+    name = ''.join(c for c in name if c.isprintable()).strip()
+    return name or None
+
+def grow_map(env:lmdb.Environment, lock, max_map_size:int) -> int | None:
+    """
+    Doubles the map size of an LMDB environment, e.g. after a write failed with MapFullError.
+
+    :param env: The environment to grow.
+    :type env: lmdb.Environment
+    :param lock: Lock held by every transaction on env, the map can only be resized while none is running.
+    :type lock: threading.RLock
+    :param max_map_size: Largest the map is allowed to grow to in bytes.
+    :type max_map_size: int
+    :return: The new map size, or None once max_map_size has been reached.
+    :rtype: int | None
+    """
+    with lock:
+        current = env.info()["map_size"]
+        if current >= max_map_size:
+            return None
+        size = min(current * 2, max_map_size)
+        env.set_mapsize(size)
+        return size
+
+class NameStore:
+    """
+    LMDB backed store of announced LXMF app data (display names), keyed by destination hash.
+
+    Writes are buffered in memory and committed in batches, either every flush_interval
+    seconds or as soon as batch_size records are waiting, so a busy network doesn't cost
+    one LMDB commit per announce. Re-announces with unchanged app data are skipped, and
+    reads see buffered records before they are flushed.
+
+    Every entry also records when it was last announced. The store looks after itself
+    over long uptimes: the map grows (up to max_map_size) when it fills, entries not seen
+    for ttl seconds are expired, and the file is compacted when most of it is free space.
+
+    :param path: Directory of the LMDB environment.
+    :type path: str
+    :param map_size: Initial size of the database map in bytes, defaults to 10485760.
+    :type map_size: int
+    :param flush_interval: Seconds between background flushes, defaults to 5.
+    :type flush_interval: float
+    :param batch_size: Number of pending records that triggers an early flush, defaults to 256.
+    :type batch_size: int
+    :param name_cache_size: Number of decoded display names kept in memory, defaults to 4096.
+    :type name_cache_size: int
+    :param ttl: Seconds after the last announce before an entry is expired, None to keep forever, defaults to 30 days.
+    :type ttl: float, optional
+    :param max_map_size: Largest the map is allowed to grow to in bytes, defaults to 1 GiB.
+    :type max_map_size: int
+    :param maintenance_interval: Seconds between expiry and compaction passes, None if the owner calls maintain() itself, defaults to 1 hour.
+    :type maintenance_interval: float, optional
+    :param metrics: Registry recording commit times, defaults to None.
+    :type metrics: Metrics, optional
+    """
+    SEEN_DB = b"seen"
+
+    # Re-announces of unchanged app data only refresh the last seen time this often
+    TOUCH_INTERVAL = 3600
+
+    def __init__(self, path:str, map_size:int=10485760, flush_interval:float=5, batch_size:int=256, name_cache_size:int=4096,
+                 ttl:float | None=30*24*3600, max_map_size:int=1<<30, maintenance_interval:float | None=3600, metrics:Metrics | None=None):
+        self.path = path
+        self.metrics = metrics
+        self.max_map_size = max(map_size, max_map_size)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.ttl = ttl
+        self.maintenance_interval = maintenance_interval
+
+        self.env_lock = threading.RLock()
+        self._open(map_size)
+
+        self.pending = {}
+        self.flushing = {}
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = False
+        self.display_names = LRUCache(name_cache_size)
+        self.last_maintenance = time.monotonic()
+
+        self.skipped = 0
+        self.flushed = 0
+        self.commits = 0
+        self.expired = 0
+        self.grows = 0
+        self.compactions = 0
+
+        self.thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.thread.start()
+
+    def _open(self, map_size:int):
+        """
+        Opens the environment along with the last seen database.
+        """
+        self.env = lmdb.open(self.path, map_size=map_size, max_dbs=1)
+        self.seen = self.env.open_db(self.SEEN_DB)
+
+    def _buffered(self, key:bytes):
+        """
+        Returns (True, value) if key is waiting to be written (or being written), otherwise (False, None).
+        """
+        with self.lock:
+            for buffer in (self.pending, self.flushing):
+                if key in buffer and buffer[key][0] is not None:
+                    return True, buffer[key][0]
+        return False, None
+
+    def _read(self, key:bytes, seen:bool=False):
+        with self.env_lock, self.env.begin() as txn:
+            value = txn.get(key)
+            if not seen:
+                return value
+            last_seen = txn.get(key, db=self.seen)
+            return value, None if last_seen is None else struct.unpack(">d", last_seen)[0]
+
+    def put(self, key:bytes, value:bytes):
+        """
+        Buffers a record, skipping it if the stored value is already the same (and was seen recently).
+        """
+        value = value or b""
+        now = time.time()
+
+        buffered, current = self._buffered(key)
+        if buffered:
+            last_seen = now
+        else:
+            current, last_seen = self._read(key, seen=True)
+
+        if current == value:
+            if last_seen is not None and now - last_seen < self.TOUCH_INTERVAL:
+                self.skipped += 1
+                return
+            # Unchanged, just refresh when it was last seen
+            value = None
+
+        with self.lock:
+            if value is None and key in self.pending:
+                self.pending[key] = (self.pending[key][0], now)
+            else:
+                self.pending[key] = (value, now)
+            full = len(self.pending) >= self.batch_size
+
+        if value is not None:
+            self.display_names.pop(key)
+        if full:
+            self.wake.set()
+
+    def get(self, key:bytes) -> bytes | None:
+        """
+        Returns the value for key, including records not yet flushed.
+        """
+        buffered, value = self._buffered(key)
+        if buffered:
+            return value
+        return self._read(key)
+
+    def display_name(self, key:bytes) -> str | None:
+        """
+        Returns the decoded, sanitized display name for key, served from memory after the first lookup.
+        """
+        name = self.display_names.get(key, _MISSING)
+        if name is _MISSING:
+            name = decode_display_name(self.get(key))
+            self.display_names.put(key, name)
+        return name
+
+    def _grow(self) -> bool:
+        """
+        Doubles the map size, returning False once max_map_size has been reached.
+        """
+        size = grow_map(self.env, self.env_lock, self.max_map_size)
+        if size is None:
+            return False
+        self.grows += 1
+        RNS.log(f"Names database full, grew map to {RNS.prettysize(size)}", RNS.LOG_NOTICE)
+        return True
+
+    def _write(self, batch:dict):
+        """
+        Writes a batch in one transaction, growing the map and retrying if it is full.
+        """
+        while True:
+            try:
+                with self.env_lock, self.env.begin(write=True) as txn:
+                    for (key, (value, last_seen)) in batch.items():
+                        if value is not None:
+                            txn.put(key, value)
+                        txn.put(key, struct.pack(">d", last_seen), db=self.seen)
+                return
+            except lmdb.MapFullError:
+                if not self._grow():
+                    raise
+
+    def flush(self) -> int:
+        """
+        Commits every buffered record in a single transaction.
+
+        :return: Number of records written.
+        :rtype: int
+        """
+        with self.flush_lock:
+            with self.lock:
+                batch = self.pending
+                self.pending = {}
+                self.flushing = batch
+
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                self._write(batch)
+            except Exception:
+                # Put the batch back (without clobbering newer records) so it isn't lost
+                with self.lock:
+                    self.pending = {**batch, **self.pending}
+                raise
+            finally:
+                with self.lock:
+                    self.flushing = {}
+
+            self.commits += 1
+            self.flushed += len(batch)
+            if self.metrics is not None:
+                self.metrics.observe("names_commit_seconds", time.perf_counter() - started)
+            return len(batch)
+
+    def expire(self) -> int:
+        """
+        Deletes entries that haven't been announced within the ttl.
+
+        Entries stored before last seen times were recorded are treated as seen now.
+
+        :return: Number of entries removed.
+        :rtype: int
+        """
+        if self.ttl is None:
+            return 0
+
+        now = time.time()
+        cutoff = now - self.ttl
+        removed = 0
+        while True:
+            try:
+                with self.env_lock, self.env.begin(write=True) as txn:
+                    stale = []
+                    unseen = []
+                    for key in txn.cursor().iternext(values=False):
+                        if key == self.SEEN_DB:
+                            continue
+                        last_seen = txn.get(key, db=self.seen)
+                        if last_seen is None:
+                            unseen.append(key)
+                        elif struct.unpack(">d", last_seen)[0] < cutoff:
+                            stale.append(key)
+
+                    for key in stale:
+                        txn.delete(key)
+                        txn.delete(key, db=self.seen)
+                    for key in unseen:
+                        txn.put(key, struct.pack(">d", now), db=self.seen)
+                    removed = len(stale)
+                break
+            except lmdb.MapFullError:
+                if not self._grow():
+                    raise
+
+        for key in stale:
+            self.display_names.pop(key)
+        self.expired += removed
+        return removed
+
+    def _usage(self) -> tuple:
+        """
+        Returns (used bytes, file bytes), used being the pages held by live data rather than free pages.
+        """
+        with self.env_lock, self.env.begin() as txn:
+            pages = 2
+            for stat in (txn.stat(), txn.stat(self.seen)):
+                pages += stat["branch_pages"] + stat["leaf_pages"] + stat["overflow_pages"]
+            used = pages * stat["psize"]
+        return used, os.path.getsize(os.path.join(self.path, "data.mdb"))
+
+    def compact(self):
+        """
+        Rewrites the database file without its free pages, shrinking it on disk.
+        """
+        self.flush()
+        compacted = os.path.join(self.path, "compact")
+        with self.env_lock:
+            map_size = self.env.info()["map_size"]
+            if os.path.exists(compacted):
+                shutil.rmtree(compacted)
+            os.makedirs(compacted)
+
+            self.env.copy(compacted, compact=True)
+            self.env.close()
+            os.replace(os.path.join(compacted, "data.mdb"), os.path.join(self.path, "data.mdb"))
+            shutil.rmtree(compacted)
+            self._open(map_size)
+
+        self.compactions += 1
+
+    def maintain(self):
+        """
+        Expires stale entries, then compacts the file if more than half of it is unused.
+        """
+        self.expire()
+        used, size = self._usage()
+        if size > 1048576 and used * 2 < size:
+            self.compact()
+
+    def _flush_loop(self):
+        while not self.stopped:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            try:
+                self.flush()
+                if self.maintenance_interval is not None and time.monotonic() - self.last_maintenance > self.maintenance_interval:
+                    self.last_maintenance = time.monotonic()
+                    self.maintain()
+            except Exception as e:
+                RNS.log(f"Names database maintenance failed: {e}", RNS.LOG_ERROR)
+
+    def close(self):
+        """
+        Stops the background flusher and writes out anything still buffered.
+        """
+        if self.stopped:
+            return
+        self.stopped = True
+        self.wake.set()
+        self.thread.join()
+        self.flush()
+
+    @property
+    def stats(self) -> dict:
+        """
+        Entry count and sizes in bytes, along with write, expiry and maintenance counters.
+
+        :rtype: dict
+        """
+        with self.env_lock:
+            # The named last seen database has a record in the main database too
+            entries = self.env.stat()["entries"] - 1
+            map_size = self.env.info()["map_size"]
+        used, size = self._usage()
+        return {
+            "entries": entries,
+            "used_size": used,
+            "file_size": size,
+            "map_size": map_size,
+            "pending": len(self.pending),
+            "flushed": self.flushed,
+            "skipped": self.skipped,
+            "commits": self.commits,
+            "expired": self.expired,
+            "grows": self.grows,
+            "compactions": self.compactions,
+        }
@@ -0,0 +1,361 @@
+from __future__ import annotations
+import time, heapq, random, struct, itertools, threading
+from collections import deque
+from .metrics import Metrics
+from .names import grow_map
+from .lazy import lazy_import
+
+RNS = lazy_import("RNS")
+LXMF = lazy_import("LXMF")
+lmdb = lazy_import("lmdb")
+
+# LXMF delivery methods, the values of LXMF.LXMessage's constants, usable without loading LXMF
+OPPORTUNISTIC = 0x01
+DIRECT = 0x02
+PROPAGATED = 0x03
+PAPER = 0x05
+
+# Fields of a stored message
+DESTINATION, CONTENT, TITLE, METHOD, ATTEMPTS, NOT_BEFORE, INCLUDE_TICKET, ENQUEUED_AT = range(8)
+
+class Outbox:
+    """
+    LMDB backed queue of outbound LXMF messages, fed to the router at a controlled rate.
+
+    Messages are written to disk when queued and only removed once LXMF reports them
+    delivered (or handed to a propagation node), so replies survive restarts. A message
+    that was in flight when the process stopped is sent again on the next start.
+
+    A sender thread hands at most rate messages per second to the router, with no more
+    than max_in_flight awaiting an outcome at once, so a broadcast to thousands of peers
+    trickles out instead of flooding the router. Failed messages are retried after
+    retry_delay, doubling for every attempt, with the delivery method escalating along
+    methods (e.g. opportunistic, then direct, then through a propagation node). Messages
+    that fail max_attempts times are moved to a failed database for inspection.
+
+    Recipients whose identity isn't known yet are waited for (requesting a path) for up
+    to path_timeout seconds before the message fails.
+
+    :param path: Directory of the LMDB environment.
+    :type path: str
+    :param router: LXMF router sending the messages.
+    :type router: LXMF.LXMRouter
+    :param source: Source destination messages are sent from.
+    :type source: RNS.Destination
+    :param rate: Messages handed to the router per second, defaults to 5.
+    :type rate: float
+    :param max_in_flight: Messages sent but not yet delivered or failed, defaults to 32.
+    :type max_in_flight: int
+    :param methods: Delivery methods tried in order, defaults to opportunistic, direct then propagated.
+    :type methods: tuple
+    :param max_attempts: Attempts before a message is given up on, defaults to 3.
+    :type max_attempts: int
+    :param retry_delay: Seconds before the first retry, defaults to 30.
+    :type retry_delay: float
+    :param path_timeout: Seconds to wait for an unknown recipient's identity, defaults to 600.
+    :type path_timeout: float
+    :param map_size: Initial size of the database map in bytes, defaults to 64 MiB.
+    :type map_size: int
+    :param max_map_size: Largest the map is allowed to grow to in bytes, defaults to 1 GiB.
+    :type max_map_size: int
+    :param metrics: Registry recording sends, deliveries and failures, defaults to None.
+    :type metrics: Metrics, optional
+    """
+    FAILED_DB = b"failed"
+
+    METHODS = (OPPORTUNISTIC, DIRECT, PROPAGATED)
+
+    def __init__(self, path:str, router:LXMF.LXMRouter, source:RNS.Destination, rate:float=5, max_in_flight:int=32,
+                 methods:tuple=METHODS, max_attempts:int=3, retry_delay:float=30, path_timeout:float=600,
+                 map_size:int=1<<26, max_map_size:int=1<<30, metrics:Metrics | None=None):
+        assert rate > 0, "Outbox rate must be positive."
+        assert max_in_flight > 0, "Outbox must allow at least one message in flight."
+        assert max_attempts > 0, "Messages need at least one attempt."
+
+        self.router = router
+        self.source = source
+        self.rate = rate
+        self.max_in_flight = max_in_flight
+        self.methods = tuple(methods)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.path_timeout = path_timeout
+        self.max_map_size = max(map_size, max_map_size)
+        self.metrics = metrics
+
+        self.env = lmdb.open(path, map_size=map_size, max_dbs=1)
+        self.failed_db = self.env.open_db(self.FAILED_DB)
+        self.env_lock = threading.RLock()
+
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = False
+        self.due = []
+        self.in_flight = {}
+        self.outcomes = deque()
+
+        self.sent = 0
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+
+        # Everything still on disk is pending again, including what was in flight before a restart
+        with self.env.begin() as txn:
+            for (key, value) in txn.cursor():
+                if key != self.FAILED_DB:
+                    heapq.heappush(self.due, (RNS.vendor.umsgpack.unpackb(value)[NOT_BEFORE], key))
+
+        self.thread = threading.Thread(target=self._send_loop, daemon=True)
+        self.thread.start()
+
+    def _grow(self) -> bool:
+        """
+        Doubles the map size, returning False once max_map_size has been reached.
+        """
+        return grow_map(self.env, self.env_lock, self.max_map_size) is not None
+
+    def _write(self, puts:list=(), deletes:list=(), db=None):
+        """
+        Writes records and deletes keys in one transaction, growing the map if it is full.
+        """
+        while True:
+            try:
+                with self.env_lock, self.env.begin(write=True) as txn:
+                    for key in deletes:
+                        txn.delete(key)
+                    for (key, value) in puts:
+                        txn.put(key, value, db=db)
+                return
+            except lmdb.MapFullError:
+                if not self._grow():
+                    raise
+
+    def _key(self) -> bytes:
+        return struct.pack(">QI", time.time_ns(), next(self.counter) & 0xffffffff)
+
+    def enqueue_many(self, identity_hashes:list, content, method:int=OPPORTUNISTIC, include_ticket:bool=True, title:str="") -> list:
+        """
+        Queues the same message for many recipients in a single transaction, e.g. for a broadcast.
+
+        :param identity_hashes: Hashes of the recipients' identities (their lxmf.delivery destination hashes).
+        :type identity_hashes: list
+        :param content: The message content.
+        :type content: str
+        :param method: Delivery method of the first attempt, defaults to LXMF.LXMessage.OPPORTUNISTIC.
+        :type method: int
+        :param include_ticket: Whether to include a ticket, defaults to True.
+        :type include_ticket: bool
+        :param title: The message title, defaults to "".
+        :type title: str
+        :return: Ids of the queued messages.
+        :rtype: list
+        """
+        now = time.time()
+        records = [
+            (self._key(), RNS.vendor.umsgpack.packb([identity_hash, content, title, method, 0, now, include_ticket, now]))
+            for identity_hash in identity_hashes
+        ]
+        self._write(records)
+
+        with self.lock:
+            for (key, _) in records:
+                heapq.heappush(self.due, (now, key))
+        self.wake.set()
+        return [key for (key, _) in records]
+
+    def enqueue(self, identity_hash:bytes, content, method:int=OPPORTUNISTIC, include_ticket:bool=True, title:str="") -> bytes:
+        """
+        Queues a message, it is sent as soon as the rate allows.
+
+        :return: Id of the queued message.
+        :rtype: bytes
+        """
+        return self.enqueue_many([identity_hash], content, method, include_ticket, title)[0]
+
+    def _method(self, record:list) -> int:
+        """
+        Picks the delivery method of the next attempt, escalating from the requested one.
+        """
+        method = record[METHOD]
+        if not method in self.methods:
+            return method
+
+        methods = self.methods[self.methods.index(method):]
+        # Propagation is only possible through a configured node
+        if self.router.get_outbound_propagation_node() is None:
+            methods = tuple(m for m in methods if m != PROPAGATED) or (method,)
+        return methods[min(record[ATTEMPTS], len(methods) - 1)]
+
+    def _send(self, key:bytes):
+        """
+        Builds and hands a stored message to the router, or reschedules it if the recipient is unknown.
+        """
+        with self.env_lock, self.env.begin() as txn:
+            value = txn.get(key)
+        if value is None:
+            return
+        record = RNS.vendor.umsgpack.unpackb(value)
+
+        identity = RNS.Identity.recall(record[DESTINATION])
+        if identity is None:
+            if time.time() - record[ENQUEUED_AT] > self.path_timeout:
+                self._fail(key, record, "recipient identity unknown")
+                return
+            RNS.Transport.request_path(record[DESTINATION])
+            self._reschedule(key, record, self.retry_delay)
+            return
+
+        destination = RNS.Destination(identity, RNS.Destination.OUT, RNS.Destination.SINGLE, "lxmf", "delivery")
+        method = self._method(record)
+        lxm = LXMF.LXMessage(destination, self.source, record[CONTENT], title=record[TITLE], desired_method=method, include_ticket=record[INCLUDE_TICKET])
+        lxm.register_delivery_callback(lambda lxm: self._outcome(key, True))
+        lxm.register_failed_callback(lambda lxm: self._outcome(key, False))
+
+        with self.lock:
+            self.in_flight[key] = (lxm, record)
+            self.sent += 1
+        if self.metrics is not None:
+            self.metrics.inc("outbox_sent_total", method=str(method))
+        self.router.handle_outbound(lxm)
+
+    def _outcome(self, key:bytes, delivered:bool):
+        """
+        Records a delivery or failure reported by LXMF, it is handled on the sender thread.
+        """
+        self.outcomes.append((key, delivered))
+        self.wake.set()
+
+    def _reschedule(self, key:bytes, record:list, delay:float):
+        record[NOT_BEFORE] = time.time() + delay * random.uniform(0.9, 1.1)
+        self._write([(key, RNS.vendor.umsgpack.packb(record))])
+        with self.lock:
+            heapq.heappush(self.due, (record[NOT_BEFORE], key))
+
+    def _fail(self, key:bytes, record:list, reason:str):
+        """
+        Moves a message that won't be retried to the failed database.
+        """
+        self._write([(key, RNS.vendor.umsgpack.packb(record + [reason, time.time()]))], [key], db=self.failed_db)
+        self.failed += 1
+        if self.metrics is not None:
+            self.metrics.inc("outbox_failed_total")
+        RNS.log(f"Gave up on message to {RNS.prettyhexrep(record[DESTINATION])}: {reason}", RNS.LOG_WARNING)
+
+    def _settle(self):
+        """
+        Applies delivery outcomes, including propagated messages the router has handed to a propagation node.
+        """
+        with self.lock:
+            for (key, (lxm, _)) in self.in_flight.items():
+                if lxm.desired_method == LXMF.LXMessage.PROPAGATED and lxm.state == LXMF.LXMessage.SENT:
+                    self.outcomes.append((key, True))
+
+        while self.outcomes:
+            key, delivered = self.outcomes.popleft()
+            with self.lock:
+                entry = self.in_flight.pop(key, None)
+            if entry is None:
+                continue
+            (lxm, record) = entry
+
+            if delivered:
+                self._write(deletes=[key])
+                self.delivered += 1
+                if self.metrics is not None:
+                    self.metrics.inc("outbox_delivered_total")
+                    self.metrics.observe("outbox_delivery_seconds", time.time() - record[ENQUEUED_AT])
+                continue
+
+            record[ATTEMPTS] += 1
+            if record[ATTEMPTS] >= self.max_attempts:
+                self._fail(key, record, f"delivery failed {record[ATTEMPTS]} times")
+            else:
+                self.retried += 1
+                self._reschedule(key, record, self.retry_delay * 2 ** (record[ATTEMPTS] - 1))
+
+    def _send_loop(self):
+        tokens = 1.0
+        last = time.monotonic()
+        while not self.stopped:
+            try:
+                self._settle()
+
+                now = time.monotonic()
+                tokens = min(tokens + (now - last) * self.rate, max(self.rate, 1.0))
+                last = now
+
+                while tokens >= 1 and len(self.in_flight) < self.max_in_flight and not self.stopped:
+                    with self.lock:
+                        if not self.due or self.due[0][0] > time.time():
+                            break
+                        (_, key) = heapq.heappop(self.due)
+                        if key in self.in_flight:
+                            continue
+                    self._send(key)
+                    tokens -= 1
+            except Exception as e:
+                RNS.log(f"Outbox failed to send: {e}", RNS.LOG_ERROR)
+
+            with self.lock:
+                next_due = self.due[0][0] - time.time() if self.due else 1.0
+            self.wake.wait(min(max(next_due, 1 / self.rate), 1.0))
+            self.wake.clear()
+
+    def failures(self) -> list:
+        """
+        Returns the messages that were given up on, as dicts.
+
+        :rtype: list
+        """
+        failures = []
+        with self.env_lock, self.env.begin() as txn:
+            for (key, value) in txn.cursor(db=self.failed_db):
+                record = RNS.vendor.umsgpack.unpackb(value)
+                failures.append({
+                    "id": key,
+                    "destination": record[DESTINATION],
+                    "content": record[CONTENT],
+                    "attempts": record[ATTEMPTS],
+                    "reason": record[ENQUEUED_AT + 1],
+                    "failed_at": record[ENQUEUED_AT + 2],
+                })
+        return failures
+
+    def close(self):
+        """
+        Stops the sender, queued messages stay on disk and are sent on the next start.
+        """
+        if self.stopped:
+            return
+        self.stopped = True
+        self.wake.set()
+        self.thread.join()
+        with self.env_lock:
+            self.env.close()
+
+    @property
+    def stats(self) -> dict:
+        """
+        Queue sizes and send, delivery, retry and failure counters.
+
+        :rtype: dict
+        """
+        with self.env_lock:
+            # The named failed database has a record in the main database too
+            queued = self.env.stat()["entries"] - 1
+            with self.env.begin() as txn:
+                failed_stored = txn.stat(self.failed_db)["entries"]
+        with self.lock:
+            waiting = sum(1 for (not_before, _) in self.due if not_before > time.time())
+            in_flight = len(self.in_flight)
+        return {
+            "queued": queued,
+            "waiting": waiting,
+            "in_flight": in_flight,
+            "sent": self.sent,
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "failed": self.failed,
+            "failed_stored": failed_stored,
+        }
@@ -0,0 +1,160 @@
+import time, queue, threading
+from .lazy import lazy_import
+
+RNS = lazy_import("RNS")
+
+class DeliveryPipeline:
+    """
+    Processes inbound messages in parallel across authors while keeping each author's messages in order.
+
+    Messages are sharded by their source hash onto a fixed set of workers, each with its
+    own bounded queue, so one author's messages always run one after the other on the
+    same worker while different authors run concurrently.
+
+    When a shard queue is full the policy decides what happens:
+
+    - ``BLOCK``: the router's delivery thread waits (up to block_timeout seconds) for space, applying backpressure.
+    - ``DROP_NEWEST``: the incoming message is dropped.
+    - ``DROP_OLDEST``: the oldest queued message in that shard is dropped to make room.
+
+    :param workers: Number of worker threads (and shards), defaults to 4.
+    :type workers: int
+    :param max_queue: Maximum number of queued messages per shard, defaults to 256.
+    :type max_queue: int
+    :param policy: What to do when a shard is full, defaults to BLOCK.
+    :type policy: str
+    :param block_timeout: Seconds to wait for space under the BLOCK policy before dropping, defaults to 30.
+    :type block_timeout: float
+    """
+    BLOCK = "block"
+    DROP_NEWEST = "drop_newest"
+    DROP_OLDEST = "drop_oldest"
+
+    def __init__(self, workers:int=4, max_queue:int=256, policy:str=BLOCK, block_timeout:float=30):
+        assert workers > 0, "Pipeline needs at least one worker."
+        assert max_queue > 0, "Pipeline queues must hold at least one message."
+        assert policy in (self.BLOCK, self.DROP_NEWEST, self.DROP_OLDEST), f"Unknown queue policy '{policy}'."
+
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.shards = [queue.Queue(maxsize=max_queue) for _ in range(workers)]
+        self.lock = threading.Lock()
+
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+        self.threads = [threading.Thread(target=self._worker, args=(shard,), daemon=True) for shard in self.shards]
+        for thread in self.threads:
+            thread.start()
+
+    def _count(self, **changes):
+        """
+        Updates counters under the lock.
+        """
+        with self.lock:
+            for (name, value) in changes.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def submit(self, source_hash:bytes, job) -> bool:
+        """
+        Queues a job behind any earlier jobs from the same source.
+
+        :param source_hash: Hash of the message source, used to pick the shard.
+        :type source_hash: bytes
+        :param job: Callable run by the worker.
+        :type job: callable
+        :return: False if the job was dropped.
+        :rtype: bool
+        """
+        shard = self.shards[int.from_bytes(source_hash[:4], "big") % len(self.shards)]
+        item = (time.monotonic(), job)
+
+        try:
+            if self.policy == self.BLOCK:
+                shard.put(item, timeout=self.block_timeout)
+            elif self.policy == self.DROP_NEWEST:
+                shard.put_nowait(item)
+            else:
+                while True:
+                    try:
+                        shard.put_nowait(item)
+                        break
+                    except queue.Full:
+                        try:
+                            oldest = shard.get_nowait()
+                        except queue.Empty:
+                            continue
+                        shard.task_done()
+                        if oldest is None:
+                            # The pipeline is stopping, its stop sentinel stays queued and the new message is dropped
+                            shard.put(None)
+                            raise queue.Full
+                        self._count(dropped=1)
+        except queue.Full:
+            self._count(dropped=1)
+            RNS.log("Delivery pipeline full, dropped an inbound message", RNS.LOG_WARNING)
+            return False
+
+        self._count(enqueued=1)
+        return True
+
+    def _worker(self, shard:queue.Queue):
+        while True:
+            item = shard.get()
+            if item is None:
+                shard.task_done()
+                return
+
+            queued_at, job = item
+            failed = 0
+            try:
+                job()
+            except Exception as e:
+                failed = 1
+                RNS.log(f"Delivery callback failed: {e}", RNS.LOG_ERROR)
+            finally:
+                latency = time.monotonic() - queued_at
+                with self.lock:
+                    self.processed += 1
+                    self.failed += failed
+                    self.latency_total += latency
+                    self.latency_max = max(self.latency_max, latency)
+                shard.task_done()
+
+    def join(self):
+        """
+        Blocks until every queued message has been processed.
+        """
+        for shard in self.shards:
+            shard.join()
+
+    def stop(self):
+        """
+        Processes what is already queued, then stops the workers.
+        """
+        for shard in self.shards:
+            shard.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    @property
+    def stats(self) -> dict:
+        """
+        Queue lengths, message counters and enqueue-to-done latency in seconds.
+
+        :rtype: dict
+        """
+        return {
+            "queued": sum(shard.qsize() for shard in self.shards),
+            "shard_queued": [shard.qsize() for shard in self.shards],
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "latency_avg": self.latency_total / self.processed if self.processed else 0.0,
+            "latency_max": self.latency_max,
+        }
@@ -0,0 +1,149 @@
+import time, queue, threading
+from .lazy import lazy_import
+
+RNS = lazy_import("RNS")
+
+class HandlerPool:
+    """
+    Bounded pool of worker threads that run request handlers off the RNS transport thread.
+
+    Jobs wait in a bounded queue, and each link (and each identified peer) can only have
+    a limited number of requests queued or running at once, so a single slow handler or
+    greedy client can't stall everyone else. When a job is refused the caller is expected
+    to answer straight away with a short "busy" page.
+
+    :param workers: Number of worker threads, defaults to 4.
+    :type workers: int
+    :param max_queue: Maximum number of jobs waiting for a worker, defaults to 64.
+    :type max_queue: int
+    :param per_link: Maximum number of in-flight requests per link, defaults to 2.
+    :type per_link: int
+    :param per_identity: Maximum number of in-flight requests per remote identity, defaults to 4.
+    :type per_identity: int
+    """
+    def __init__(self, workers:int=4, max_queue:int=64, per_link:int=2, per_identity:int=4):
+        assert workers > 0, "Pool needs at least one worker."
+        assert max_queue > 0, "Pool queue must hold at least one job."
+
+        self.per_link = per_link
+        self.per_identity = per_identity
+        self.jobs = queue.Queue(maxsize=max_queue)
+        self.lock = threading.Lock()
+        self.link_load = {}
+        self.identity_load = {}
+
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+        self.threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def _acquire(self, link_id:bytes, identity_hash:bytes | None) -> bool:
+        """
+        Reserves a slot for the link and identity, returning False if either is at its limit.
+        """
+        with self.lock:
+            if self.link_load.get(link_id, 0) >= self.per_link or \
+                (identity_hash is not None and self.identity_load.get(identity_hash, 0) >= self.per_identity):
+                self.rejected += 1
+                return False
+
+            self.link_load[link_id] = self.link_load.get(link_id, 0) + 1
+            if identity_hash is not None:
+                self.identity_load[identity_hash] = self.identity_load.get(identity_hash, 0) + 1
+            self.in_flight += 1
+            return True
+
+    def _release(self, link_id:bytes, identity_hash:bytes | None):
+        """
+        Frees the slot reserved by _acquire.
+        """
+        with self.lock:
+            self.in_flight -= 1
+            for (load, key) in ((self.link_load, link_id), (self.identity_load, identity_hash)):
+                if key is None:
+                    continue
+                if load[key] <= 1:
+                    del load[key]
+                else:
+                    load[key] -= 1
+
+    def submit(self, link_id:bytes, identity_hash:bytes | None, job) -> bool:
+        """
+        Queues a job for a worker.
+
+        :param link_id: Id of the link the request arrived on.
+        :type link_id: bytes
+        :param identity_hash: Hash of the remote identity, or None if the peer did not identify.
+        :type identity_hash: bytes | None
+        :param job: Callable run by the worker.
+        :type job: callable
+        :return: False if the queue is full or the link/identity is already at its limit.
+        :rtype: bool
+        """
+        if not self._acquire(link_id, identity_hash):
+            return False
+
+        try:
+            self.jobs.put_nowait((time.monotonic(), link_id, identity_hash, job))
+        except queue.Full:
+            self._release(link_id, identity_hash)
+            with self.lock:
+                self.rejected += 1
+            return False
+
+        return True
+
+    def _worker(self):
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                return
+
+            queued_at, link_id, identity_hash, job = item
+            waited = time.monotonic() - queued_at
+
+            failed = False
+            try:
+                job()
+            except Exception as e:
+                failed = True
+                RNS.log(f"Request handler failed: {e}", RNS.LOG_ERROR)
+            finally:
+                self._release(link_id, identity_hash)
+                with self.lock:
+                    self.completed += 1
+                    self.failed += failed
+                    self.wait_total += waited
+                    self.wait_max = max(self.wait_max, waited)
+
+    def stop(self):
+        """
+        Lets the workers finish the queued jobs and exit.
+        """
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    @property
+    def stats(self) -> dict:
+        """
+        Queue depth, in-flight and completion counters, and queue wait times in seconds.
+
+        :rtype: dict
+        """
+        return {
+            "queued": self.jobs.qsize(),
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "wait_avg": self.wait_total / self.completed if self.completed else 0.0,
+            "wait_max": self.wait_max,
+        }
@@ -0,0 +1,180 @@
+import re
+
+ROUTE_VARIABLE = "route"
+
+VARIABLE = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)(\*?)\}")
+
+class RouteNode:
+    """
+    A single path segment in the route trie.
+    """
+    def __init__(self):
+        self.static = {}
+        self.dynamic = []
+        self.greedy = None
+        self.handler = None
+
+class Router:
+    """
+    Resolves parameterized paths such as ``/page/item/{id}.mu`` in-process.
+
+    RNS only supports exact path registration, so every pattern is served through a
+    single concrete "mount" path made of its leading static segments (``/page/item``).
+    The rest of the path travels in the ``route`` request variable, which nomadnet
+    sends for links written as ``/page/item`route=42.mu``. Lookups walk a segment trie,
+    so their cost grows with path depth rather than with the number of routes.
+
+    A segment may contain any number of ``{name}`` variables mixed with literal text,
+    and the last segment may be a greedy ``{name*}`` that captures the rest of the path.
+    """
+    def __init__(self):
+        self.root = RouteNode()
+        self.mounts = set()
+
+    @staticmethod
+    def is_pattern(path:str) -> bool:
+        """
+        Whether the path contains variables and therefore needs the router.
+        """
+        return "{" in path or "}" in path
+
+    def _compile_segment(self, segment:str, pattern:str):
+        """
+        Turns a segment like ``{id}.mu`` into an anchored regex.
+        """
+        regex = ""
+        last = 0
+        for match in VARIABLE.finditer(segment):
+            assert not match.group(2), f"Greedy variable must be a whole final segment in '{pattern}'."
+            regex += re.escape(segment[last:match.start()]) + f"(?P<{match.group(1)}>[^/]+?)"
+            last = match.end()
+        regex += re.escape(segment[last:])
+        assert not ("{" in segment[last:] or "}" in segment[last:]), f"Malformed variable in '{pattern}'."
+        return re.compile(regex)
+
+    @classmethod
+    def mount_path(cls, pattern:str) -> str:
+        """
+        Returns the concrete mount path a pattern is served through, without adding it.
+
+        :param pattern: Path pattern, e.g. ``/page/item/{id}.mu``.
+        :type pattern: str
+        :rtype: str
+        :raises AssertionError: If the pattern is malformed or has no static prefix.
+        """
+        assert pattern.startswith("/"), f"Path '{pattern}' must be absolute."
+        assert not "*" in VARIABLE.sub("", pattern), f"Wild flags in path '{pattern}' must be written as {{name*}}."
+
+        segments = pattern.split("/")[1:]
+        static = 0
+        while static < len(segments) and not cls.is_pattern(segments[static]):
+            static += 1
+
+        assert static > 0, f"Path '{pattern}' needs at least one static segment to mount on."
+        return "/" + "/".join(segments[:static])
+
+    def add(self, pattern:str, handler) -> str:
+        """
+        Adds a pattern to the route table.
+
+        :param pattern: Path pattern, e.g. ``/page/item/{id}.mu``.
+        :type pattern: str
+        :param handler: Object returned by :meth:`match` for paths matching the pattern.
+        :return: The concrete mount path that must be registered with RNS.
+        :rtype: str
+        :raises AssertionError: If the pattern is malformed or has no static prefix.
+        """
+        mount = self.mount_path(pattern)
+        segments = pattern.split("/")[1:]
+
+        node = self.root
+        for (index, segment) in enumerate(segments):
+            greedy = VARIABLE.fullmatch(segment)
+            if greedy and greedy.group(2):
+                assert index == len(segments) - 1, f"Greedy variable must be the final segment in '{pattern}'."
+                assert node.greedy is None, f"Route '{pattern}' is already registered."
+                node.greedy = (greedy.group(1), handler)
+                break
+
+            if not self.is_pattern(segment):
+                node = node.static.setdefault(segment, RouteNode())
+                continue
+
+            regex = self._compile_segment(segment, pattern)
+            for (existing, child) in node.dynamic:
+                if existing.pattern == regex.pattern:
+                    node = child
+                    break
+            else:
+                child = RouteNode()
+                node.dynamic.append((regex, child))
+                node = child
+        else:
+            assert node.handler is None, f"Route '{pattern}' is already registered."
+            node.handler = handler
+
+        self.mounts.add(mount)
+        return mount
+
+    def _match(self, node:RouteNode, segments:list, index:int):
+        """
+        Depth first walk preferring static segments over variables.
+        """
+        if index == len(segments):
+            if node.handler is not None:
+                return node.handler, {}
+            return None
+
+        segment = segments[index]
+        child = node.static.get(segment)
+        if child is not None:
+            found = self._match(child, segments, index + 1)
+            if found is not None:
+                return found
+
+        for (regex, child) in node.dynamic:
+            values = regex.fullmatch(segment)
+            if values is None:
+                continue
+            found = self._match(child, segments, index + 1)
+            if found is not None:
+                return found[0], {**values.groupdict(), **found[1]}
+
+        if node.greedy is not None:
+            name, handler = node.greedy
+            return handler, {name: "/".join(segments[index:])}
+
+        return None
+
+    def match(self, path:str):
+        """
+        Finds the handler for a concrete path.
+
+        :param path: Concrete path, e.g. ``/page/item/42.mu``.
+        :type path: str
+        :return: Tuple of the handler and the extracted variables, or None if nothing matches.
+        :rtype: tuple | None
+        """
+        return self._match(self.root, path.split("/")[1:], 0)
+
+    def resolve(self, mount:str, route:str) -> str:
+        """
+        Rebuilds the concrete path from a mount and the ``route`` request variable.
+        """
+        return mount + "/" + route.lstrip("/")
+
+    def href(self, path:str) -> str:
+        """
+        Converts a concrete path into a link target nomadnet can request.
+
+        :param path: Concrete path, e.g. ``/page/item/42.mu``.
+        :type path: str
+        :return: Link target such as ``/page/item`route=42.mu``, or the path itself if no mount covers it.
+        :rtype: str
+        """
+        segments = path.split("/")
+        for end in range(len(segments) - 1, 1, -1):
+            mount = "/".join(segments[:end])
+            if mount in self.mounts:
+                return f"{mount}`{ROUTE_VARIABLE}={'/'.join(segments[end:])}"
+        return path
@@ -0,0 +1,307 @@
+import time, heapq, random, threading
+from .lazy import lazy_import
+
+RNS = lazy_import("RNS")
+
+class Job:
+    """
+    A periodic job registered on a Scheduler.
+
+    :param name: Unique name of the job.
+    :type name: str
+    :param func: Called every interval.
+    :type func: callable
+    :param interval: Seconds between runs.
+    :type interval: float
+    :param jitter: Fraction of the interval the delay is randomly spread by, defaults to 0.1.
+    :type jitter: float
+    """
+    def __init__(self, name:str, func, interval:float, jitter:float=0.1):
+        assert interval > 0, f"Job '{name}' needs a positive interval."
+        assert 0 <= jitter < 1, "Jitter must be a fraction of the interval."
+
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.due_at = 0.0
+
+        self.runs = 0
+        self.failures = 0
+        self.last_duration = 0.0
+
+    def delay(self) -> float:
+        """
+        Returns the interval, randomly spread by the jitter.
+        """
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+class Scheduler:
+    """
+    Runs periodic jobs, one at a time, from a single thread.
+
+    Every delay is jittered so nodes started at the same moment drift apart instead of
+    doing their work (and announcing) in lockstep. Jobs are kept in a heap ordered by
+    when they are due, and can be triggered early. Jobs should be short, a slow job
+    delays the ones behind it.
+
+    The scheduler runs on the calling thread with run(), or on a daemon thread with
+    start(), until stop() is called.
+    """
+    def __init__(self):
+        self.jobs = {}
+        self.heap = []
+        self.sequence = 0
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.running = False
+        self.thread = None
+
+    def _push(self, job:Job):
+        self.sequence += 1
+        heapq.heappush(self.heap, (job.due_at, self.sequence, job))
+
+    def add(self, name:str, func, interval:float, jitter:float=0.1, delay:float | None=None) -> Job:
+        """
+        Registers a periodic job.
+
+        :param name: Unique name of the job.
+        :type name: str
+        :param func: Called every interval.
+        :type func: callable
+        :param interval: Seconds between runs.
+        :type interval: float
+        :param jitter: Fraction of the interval the delay is randomly spread by, defaults to 0.1.
+        :type jitter: float
+        :param delay: Seconds until the first run, defaults to a jittered interval.
+        :type delay: float, optional
+        :return: The registered job.
+        :rtype: Job
+        """
+        job = Job(name, func, interval, jitter)
+        with self.condition:
+            assert not name in self.jobs, f"Job '{name}' is already scheduled."
+            job.due_at = time.monotonic() + (job.delay() if delay is None else delay)
+            self.jobs[name] = job
+            self._push(job)
+            self.condition.notify()
+        return job
+
+    def remove(self, name:str):
+        """
+        Unregisters a job, it won't run again.
+        """
+        with self.condition:
+            self.jobs.pop(name, None)
+
+    def trigger(self, name:str):
+        """
+        Runs a job as soon as possible instead of waiting for it to be due.
+        """
+        with self.condition:
+            job = self.jobs.get(name)
+            if job is None:
+                return
+            job.due_at = time.monotonic()
+            self._push(job)
+            self.condition.notify()
+
+    def _next(self) -> Job | None:
+        """
+        Waits for the next due job, returning None once stopped.
+        """
+        with self.condition:
+            while not self.stopped:
+                if not self.heap:
+                    self.condition.wait()
+                    continue
+
+                due_at, _, job = self.heap[0]
+                # Entries of removed or rescheduled jobs are dropped lazily
+                if self.jobs.get(job.name) is not job or due_at != job.due_at:
+                    heapq.heappop(self.heap)
+                    continue
+
+                wait = due_at - time.monotonic()
+                if wait > 0:
+                    self.condition.wait(wait)
+                    continue
+
+                heapq.heappop(self.heap)
+                return job
+            return None
+
+    def run(self):
+        """
+        Runs due jobs on the calling thread until stop() is called.
+        """
+        with self.condition:
+            assert not self.running, "Scheduler is already running."
+            self.running = True
+
+        try:
+            while True:
+                job = self._next()
+                if job is None:
+                    return
+
+                started = time.monotonic()
+                try:
+                    job.func()
+                except Exception as e:
+                    job.failures += 1
+                    RNS.log(f"Scheduled job '{job.name}' failed: {e}", RNS.LOG_ERROR)
+                job.runs += 1
+                job.last_duration = time.monotonic() - started
+
+                with self.condition:
+                    if self.jobs.get(job.name) is job and job.due_at <= started:
+                        job.due_at = time.monotonic() + job.delay()
+                        self._push(job)
+        finally:
+            with self.condition:
+                self.running = False
+
+    def start(self):
+        """
+        Runs the scheduler on a daemon thread.
+        """
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout:float | None=None):
+        """
+        Stops the scheduler once the running job (if any) has finished.
+        """
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    @property
+    def stats(self) -> dict:
+        """
+        Runs, failures, last duration and seconds until next run of every job.
+
+        :rtype: dict
+        """
+        now = time.monotonic()
+        with self.condition:
+            return {
+                name: {
+                    "runs": job.runs,
+                    "failures": job.failures,
+                    "last_duration": job.last_duration,
+                    "due_in": max(job.due_at - now, 0.0),
+                }
+                for (name, job) in self.jobs.items()
+            }
+
+class Announcer:
+    """
+    Decides when destinations are announced, backing off while nothing changes.
+
+    Each destination is announced every interval at first. Every announce with the same
+    app data as the last one multiplies the interval by backoff, up to max_interval, so a
+    stable node spends less and less airtime on announces (peers that need it sooner can
+    still request a path). When the app data changes, or trigger() is called, the
+    destination is announced at the next check and its interval starts over.
+
+    check() is meant to be run regularly by a Scheduler job, it only announces what is due.
+
+    :param interval: Seconds between the first announces, and after any change.
+    :type interval: float
+    :param max_interval: Longest the interval backs off to, defaults to 6 times interval.
+    :type max_interval: float, optional
+    :param backoff: Factor the interval grows by for each unchanged announce, defaults to 2.
+    :type backoff: float
+    :param jitter: Fraction of the interval announces are randomly spread by, defaults to 0.1.
+    :type jitter: float
+    """
+    def __init__(self, interval:float, max_interval:float | None=None, backoff:float=2, jitter:float=0.1):
+        assert backoff >= 1, "Announces can't back off by less than 1."
+
+        self.interval = interval
+        self.max_interval = max(interval, max_interval or interval * 6)
+        self.backoff = backoff
+        self.jitter = jitter
+        self.destinations = {}
+        self.lock = threading.Lock()
+
+        self.announces = 0
+        self.changes = 0
+        self.triggers = 0
+
+    def add(self, name:str, announce, app_data):
+        """
+        Registers a destination, announced at the next check.
+
+        :param name: Name of the destination, e.g. "delivery".
+        :type name: str
+        :param announce: Called with the current app data to announce the destination.
+        :type announce: callable
+        :param app_data: Returns the app data the destination would announce now.
+        :type app_data: callable
+        """
+        with self.lock:
+            self.destinations[name] = {
+                "announce": announce,
+                "app_data": app_data,
+                "last_app_data": None,
+                "interval": self.interval,
+                "due_at": 0.0,
+                "reset": True,
+            }
+
+    def trigger(self):
+        """
+        Announces every destination at the next check and resets their intervals.
+        """
+        with self.lock:
+            self.triggers += 1
+            for destination in self.destinations.values():
+                destination["due_at"] = 0.0
+                destination["reset"] = True
+
+    def check(self):
+        """
+        Announces the destinations that are due or whose app data changed.
+        """
+        now = time.monotonic()
+        with self.lock:
+            destinations = list(self.destinations.values())
+
+        for destination in destinations:
+            app_data = destination["app_data"]()
+            changed = destination["last_app_data"] is not None and app_data != destination["last_app_data"]
+            if not changed and now < destination["due_at"]:
+                continue
+
+            if changed:
+                self.changes += 1
+            if changed or destination["reset"]:
+                destination["interval"] = self.interval
+                destination["reset"] = False
+            else:
+                destination["interval"] = min(destination["interval"] * self.backoff, self.max_interval)
+
+            destination["announce"](app_data)
+            destination["last_app_data"] = app_data
+            destination["due_at"] = now + destination["interval"] * random.uniform(1 - self.jitter, 1 + self.jitter)
+            self.announces += 1
+
+    @property
+    def stats(self) -> dict:
+        """
+        Announce, change and trigger counters, along with each destination's current interval in seconds.
+
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                "announces": self.announces,
+                "changes": self.changes,
+                "triggers": self.triggers,
+                "intervals": {name: destination["interval"] for (name, destination) in self.destinations.items()},
+            }
@@ -0,0 +1,100 @@
+import os, time, threading
+
+class StaticFile:
+    """
+    A file served from memory, along with what's needed to notice it changed on disk.
+    """
+    def __init__(self, file_path:str):
+        self.file_path = file_path
+        self.mtime = None
+        self.data = None
+        self.checked_at = 0.0
+
+    def load(self):
+        """
+        Reads the file into memory and records its modification time.
+        """
+        stat = os.stat(self.file_path)
+        with open(self.file_path, "rb") as f:
+            self.data = f.read()
+        self.mtime = stat.st_mtime_ns
+        self.checked_at = time.monotonic()
+
+class StaticDirectory:
+    """
+    Serves every file under a directory from memory at mount + relative path.
+
+    Files are read once and kept as bytes. Each file is checked for changes at most
+    once every check_interval seconds (a single stat), and reloaded when its
+    modification time changed, so serving a page normally involves no file I/O at all.
+
+    :param mount: Request path the directory is served under, e.g. "/page/docs".
+    :type mount: str
+    :param directory: Directory on disk holding the files.
+    :type directory: str
+    :param check_interval: Seconds between modification checks of a file, defaults to 2.
+    :type check_interval: float
+    """
+    def __init__(self, mount:str, directory:str, check_interval:float=2):
+        assert mount.startswith("/"), f"Mount '{mount}' must be absolute."
+        assert os.path.isdir(directory), f"'{directory}' is not a directory."
+
+        self.mount = mount.rstrip("/")
+        self.directory = directory
+        self.check_interval = check_interval
+        self.files = {}
+        self.lock = threading.Lock()
+
+    def _walk(self) -> dict:
+        """
+        Maps the request path of every (non hidden) file under the directory to its location on disk.
+        """
+        found = {}
+        for (root, dirs, files) in os.walk(self.directory):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in files:
+                if name.startswith("."):
+                    continue
+                file_path = os.path.join(root, name)
+                relative = os.path.relpath(file_path, self.directory).replace(os.sep, "/")
+                found[f"{self.mount}/{relative}"] = file_path
+        return found
+
+    def scan(self) -> tuple:
+        """
+        Picks up added and removed files.
+
+        :return: Lists of (added, removed) request paths.
+        :rtype: tuple
+        """
+        found = self._walk()
+        with self.lock:
+            added = [path for path in found if path not in self.files]
+            removed = [path for path in self.files if path not in found]
+
+            for path in added:
+                self.files[path] = StaticFile(found[path])
+                self.files[path].load()
+            for path in removed:
+                del self.files[path]
+
+        return added, removed
+
+    def get(self, path:str) -> bytes | None:
+        """
+        Returns the contents for a request path, reloading the file if it changed on disk.
+        """
+        static_file:StaticFile | None = self.files.get(path)
+        if static_file is None:
+            return None
+
+        if time.monotonic() - static_file.checked_at > self.check_interval:
+            try:
+                if os.stat(static_file.file_path).st_mtime_ns != static_file.mtime:
+                    static_file.load()
+                else:
+                    static_file.checked_at = time.monotonic()
+            except FileNotFoundError:
+                return None
+
+        return static_file.data
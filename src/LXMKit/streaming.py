@@ -0,0 +1,180 @@
+from __future__ import annotations
+import os, io, struct, types, tempfile, threading
+from collections.abc import Iterator
+from .lazy import lazy_import
+
+RNS = lazy_import("RNS")
+
+def send_response(link:RNS.Link, request_id, response):
+    """
+    Sends a complete response for a request outside of the RNS request callback, the same way RNS would.
+    """
+    if response is None or link.status != RNS.Link.ACTIVE:
+        return
+
+    if isinstance(response, (list, tuple)) and len(response) > 0 and isinstance(response[0], io.BufferedReader):
+        metadata = response[1] if len(response) > 1 else None
+        RNS.Resource(response[0], link, metadata=metadata, request_id=request_id, is_response=True)
+        return
+
+    packed_response = RNS.vendor.umsgpack.packb([request_id, response])
+    if len(packed_response) <= link.mdu:
+        RNS.Packet(link, packed_response, RNS.Packet.DATA, context=RNS.Packet.RESPONSE).send()
+    else:
+        RNS.Resource(packed_response, link, request_id=request_id, is_response=True)
+
+class ResponseStreamer:
+    """
+    Sends large handler responses without holding them in memory.
+
+    Handlers may return a generator (or any iterator) of bytes/str chunks, such as
+    ``Micron.iter_build()``, a file-like object, or a ``pathlib.Path``. The content is
+    buffered in memory up to memory_cap bytes, beyond that it is spooled to a temporary
+    file chunk by chunk, already packed the way RNS packs responses, and sent as a
+    Resource straight from that file. RNS then only reads one resource segment at a time.
+
+    At most max_transfers spooled transfers run at once, when they are all in use the
+    streamer refuses and the caller should answer with a "busy" page instead.
+
+    :param max_transfers: Maximum number of concurrent spooled transfers, defaults to 4.
+    :type max_transfers: int
+    :param memory_cap: Bytes kept in memory before a response is spooled to disk, defaults to 65536.
+    :type memory_cap: int
+    :param chunk_size: Size of the reads from file responses, defaults to 16384.
+    :type chunk_size: int
+    """
+    def __init__(self, max_transfers:int=4, memory_cap:int=65536, chunk_size:int=16384):
+        assert max_transfers > 0, "At least one transfer must be allowed."
+        self.max_transfers = max_transfers
+        self.memory_cap = memory_cap
+        self.chunk_size = chunk_size
+        self.slots = threading.BoundedSemaphore(max_transfers)
+        self.lock = threading.Lock()
+
+        self.active = 0
+        self.spooled = 0
+        self.buffered = 0
+        self.refused = 0
+
+    @staticmethod
+    def is_streamed(response) -> bool:
+        """
+        Whether a handler response needs streaming rather than being sent as is.
+        """
+        return isinstance(response, (types.GeneratorType, Iterator, os.PathLike)) or \
+            (hasattr(response, "read") and not isinstance(response, (bytes, bytearray)))
+
+    def _chunks(self, response):
+        """
+        Yields the response content as bytes chunks.
+        """
+        if isinstance(response, os.PathLike):
+            response = open(response, "rb")
+
+        if hasattr(response, "read"):
+            try:
+                while True:
+                    chunk = response.read(self.chunk_size)
+                    if not chunk:
+                        return
+                    yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+            finally:
+                response.close()
+
+        for chunk in response:
+            yield chunk.encode("utf-8") if isinstance(chunk, str) else bytes(chunk)
+
+    def _release(self):
+        """
+        Frees a transfer slot.
+        """
+        with self.lock:
+            self.active -= 1
+        self.slots.release()
+
+    def send(self, link:RNS.Link, request_id, response) -> bool:
+        """
+        Streams a response to the requester.
+
+        :param link: Link the request arrived on.
+        :type link: RNS.Link
+        :param request_id: Id of the request being answered.
+        :type request_id: bytes
+        :param response: Generator, iterator, file-like object or path.
+        :return: False if every transfer slot is in use and nothing was sent.
+        :rtype: bool
+        """
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.refused += 1
+            return False
+
+        with self.lock:
+            self.active += 1
+
+        released = []
+        def release(resource=None):
+            if not released:
+                released.append(True)
+                if spool is not None:
+                    spool.close()
+                self._release()
+
+        spool = None
+        try:
+            buffered = []
+            size = 0
+            for chunk in self._chunks(response):
+                size += len(chunk)
+                if spool is not None:
+                    spool.write(chunk)
+                    continue
+
+                buffered.append(chunk)
+                if size > self.memory_cap:
+                    # Too big to keep around, pack it on disk like umsgpack.packb([request_id, data]) would
+                    spool = tempfile.TemporaryFile()
+                    spool.write(b"\x92" + RNS.vendor.umsgpack.packb(request_id) + b"\xc6\x00\x00\x00\x00")
+                    for pending in buffered:
+                        spool.write(pending)
+                    buffered = None
+
+            if spool is None:
+                release()
+                with self.lock:
+                    self.buffered += 1
+                send_response(link, request_id, b"".join(buffered))
+                return True
+
+            if link.status != RNS.Link.ACTIVE:
+                release()
+                return True
+
+            # Fill in the bin32 length now that the size is known
+            spool.seek(1 + len(RNS.vendor.umsgpack.packb(request_id)) + 1)
+            spool.write(struct.pack(">I", size))
+            spool.flush()
+            spool.seek(0)
+
+            with self.lock:
+                self.spooled += 1
+            RNS.Resource(spool, link, request_id=request_id, is_response=True, callback=release)
+            return True
+
+        except Exception:
+            release()
+            raise
+
+    @property
+    def stats(self) -> dict:
+        """
+        Active transfers, and how many responses were spooled, sent from memory or refused.
+
+        :rtype: dict
+        """
+        return {
+            "active": self.active,
+            "spooled": self.spooled,
+            "buffered": self.buffered,
+            "refused": self.refused,
+        }
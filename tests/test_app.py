@@ -0,0 +1,86 @@
+"""
+Tests of app level registration, on apps created with defer_start so no network is started.
+"""
+import pytest
+from LXMKit.app import LXMFApp
+
+@pytest.fixture
+def app(tmp_path):
+    app = LXMFApp("test", storage_path=str(tmp_path), defer_start=True)
+    yield app
+    app.stop()
+
+def test_route_mount_conflict_leaves_no_route(app):
+    @app.request_handler("/page/item")
+    def item():
+        return b"item"
+
+    with pytest.raises(ValueError):
+        @app.request_handler("/page/item/{id}.mu")
+        def routed(path_vars):
+            return b"routed"
+
+    assert app.routes.match("/page/item/1.mu") is None
+    assert not app.routes.mounts
+
+def test_path_conflicting_with_mount(app):
+    @app.request_handler("/page/item/{id}.mu")
+    def routed(path_vars):
+        return b"routed"
+
+    with pytest.raises(ValueError):
+        app.request_handler("/page/item")(lambda: b"item")
+    assert not "/page/item" in app.function_paths
+
+def test_wildcard_path(app):
+    with pytest.raises(ValueError):
+        app.request_handler("/page/*")
+
+def test_stop_ends_private_loop(tmp_path):
+    app = LXMFApp("test", storage_path=str(tmp_path), defer_start=True)
+
+    async def answer():
+        return 42
+
+    assert app._submit(answer()).result(timeout=5) == 42
+    thread = app.loop_thread.thread
+    app.stop()
+    assert not thread.is_alive()
+    assert app.loop.is_closed()
+
+def test_static_file_does_not_replace_handler(app, tmp_path):
+    pages = tmp_path / "pages"
+    pages.mkdir()
+    (pages / "index.mu").write_bytes(b"static index")
+    (pages / "about.mu").write_bytes(b"static about")
+
+    @app.request_handler("/page/index.mu")
+    def index():
+        return b"handler index"
+    handler = app.function_paths["/page/index.mu"]
+
+    app.mount_static("/page", str(pages))
+    assert app.function_paths["/page/index.mu"] is handler
+    assert "/page/about.mu" in app.function_paths
+
+    # Removing the file leaves the user's handler in place
+    (pages / "index.mu").unlink()
+    (pages / "about.mu").unlink()
+    app.rescan_static()
+    assert app.function_paths["/page/index.mu"] is handler
+    assert "/page/about.mu" not in app.function_paths
+
+def test_removed_static_file_keeps_newer_handler(app, tmp_path):
+    pages = tmp_path / "pages"
+    pages.mkdir()
+    (pages / "about.mu").write_bytes(b"static about")
+    app.mount_static("/page", str(pages))
+
+    @app.request_handler("/page/about.mu")
+    def about():
+        return b"handler about"
+    handler = app.function_paths["/page/about.mu"]
+
+    (pages / "about.mu").unlink()
+    app.rescan_static()
+    assert app.function_paths["/page/about.mu"] is handler
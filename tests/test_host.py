@@ -0,0 +1,36 @@
+"""
+Tests of hosting apps, on a Reticulum instance without interfaces (Reticulum can only be started once per process).
+"""
+import pytest
+from LXMKit.host import Host
+
+CONFIG = """
+[reticulum]
+  enable_transport = No
+  share_instance = No
+
+[logging]
+  loglevel = 2
+
+[interfaces]
+"""
+
+@pytest.fixture(scope="module")
+def host(tmp_path_factory):
+    storage_path = tmp_path_factory.mktemp("host")
+    (storage_path / "config").write_text(CONFIG)
+    host = Host(str(storage_path))
+    yield host
+    host.stop()
+
+@pytest.mark.parametrize("app_name", ["", ".", "..", "a/b", "../escape", "a\\b", "names", "storage", "Config", "interfaces"])
+def test_invalid_app_name(host, app_name):
+    with pytest.raises(ValueError):
+        host.add(app_name)
+    assert not host.apps
+
+def test_duplicate_app_name(host):
+    app = host.add("My Bot")
+    with pytest.raises(ValueError):
+        host.add("my bot")
+    assert list(host.apps.values()) == [app]
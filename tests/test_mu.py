@@ -0,0 +1,273 @@
+"""
+Golden output tests for the micron renderer.
+
+The expected strings were captured from the original string-concatenating renderer,
+so any change to the output of render(), iter_render(), build() or iter_build() is caught.
+"""
+import re
+import pytest
+from LXMKit import mu
+from LXMKit.mu import Micron
+
+FOOTER = "\n# Made using LXMKit"
+
+STYLES = {
+    "none": None,
+    "empty": [],
+    "inline": [mu.FOREGROUND_RED, mu.BACKGROUND_BLUE, mu.BOLD, mu.ITALIC, mu.UNDERLINE],
+    "line": [mu.CENTER, mu.RESET],
+    "mixed": [mu.BOLD, mu.FOREGROUND_RED, mu.CENTER],
+}
+
+def page_cases(m):
+    """
+    Trees covering every element type, alone and nested, with and without styles.
+
+    Built from the module m, so the same trees can be rendered by the original mu.py to recapture GOLDEN.
+    """
+    login = m.Header("Login Form Example", [
+        m.Div([
+            m.Br(),
+            m.Span([m.Paragraph("Username: "), m.Input("name", "Anonymous", 16, style=[m.BACKGROUND_DARK_GREY])]),
+            m.Span([m.Paragraph("Password: "), m.Input("pass", "password123", 16, style=[m.BACKGROUND_DARK_GREY])]),
+            m.Br(),
+            m.Anchor("   Submit   ", href=None, style=[m.BACKGROUND_DARK_GREY]),
+            m.Br(),
+        ], style=[m.BACKGROUND_DARKER_GREY, m.CENTER]),
+    ])
+    return {
+        "paragraph": [m.Paragraph("Hello World!")],
+        "paragraph_styled": [m.Paragraph("Hello", style=[m.FOREGROUND_RED, m.BACKGROUND_BLUE, m.BOLD, m.ITALIC, m.UNDERLINE, m.CENTER])],
+        "paragraph_markup": [m.Paragraph("p<>`x")],
+        "paragraphs": [m.Paragraph("one"), m.Paragraph("two", style=[m.RIGHT]), m.Paragraph("three", style=[])],
+        "header": [m.Header("Title")],
+        "header_styled": [m.Header("Title", [m.Paragraph("body")], style=[m.FOREGROUND_GREEN, m.LEFT])],
+        "headers_nested": [m.Header("One", [m.Paragraph("a"), m.Header("Two", [m.Paragraph("b"), m.Header("Three", [m.Paragraph("c")])])])],
+        "div": [m.Div([m.Paragraph("a"), m.Paragraph("b")])],
+        "div_styled": [m.Div([m.Paragraph("a"), m.Hr(), m.Header("H", [m.Paragraph("b")])], style=[m.BACKGROUND_GREY, m.CENTER])],
+        "div_indented": [m.Header("H", [m.Div([m.Paragraph("a"), m.Div([m.Paragraph("b")], style=[m.FOREGROUND_RED])], style=[m.FOREGROUND_BLUE])])],
+        "span": [m.Span([m.Paragraph("a"), m.Paragraph("b", style=[m.BOLD]), m.Anchor("c", "/page/c.mu")])],
+        "span_styled": [m.Span([m.Paragraph("a"), m.Input("n", "d")], style=[m.CENTER, m.FOREGROUND_RED])],
+        "input": [m.Input("name")],
+        "input_options": [m.Input("secret", "hunter2", 12, True, style=[m.BACKGROUND_DARK_GREY])],
+        "checkbox": [m.Checkbox(), m.Checkbox("agree", "yes", True)],
+        "radio": [m.Radio("colour", "red"), m.Radio("colour", "blue", True, style=[m.FOREGROUND_BLUE])],
+        "anchor": [m.Anchor("Home", "/page/index.mu"), m.Anchor("Styled", "/page/x.mu`a=1", style=[m.UNDERLINE, m.FOREGROUND_ORANGE])],
+        "br": [m.Paragraph("a"), m.Br(), m.Paragraph("b"), m.Br(style=[m.CENTER])],
+        "hr": [m.Hr(), m.Hr(type="="), m.Hr(style=[m.FOREGROUND_GREY, m.CENTER], type="-")],
+        "inherit_header_div_span": [m.Header("H", [
+            m.Div([
+                m.Span([m.Paragraph("plain"), m.Input("i", "v", style=[m.FOREGROUND_RED]), m.Radio("r", "1"), m.Anchor("a", "/page/a.mu")], style=[m.LEFT]),
+                m.Paragraph("after"),
+            ], style=[m.FOREGROUND_GREEN]),
+            m.Span([m.Anchor("b", "/page/b.mu", style=[m.BOLD])], style=[m.RIGHT, m.BACKGROUND_RED]),
+        ], style=[m.BACKGROUND_BLUE, m.CENTER])],
+        "inherit_same_style": [m.Div([m.Input("i", style=[m.FOREGROUND_RED]), m.Anchor("a", "/page/a.mu", style=[m.FOREGROUND_RED])], style=[m.FOREGROUND_RED])],
+        "inherit_nested_divs": [m.Div([m.Div([m.Div([m.Paragraph("deep"), m.Radio("r", "v", style=[m.ITALIC])], style=[m.BACKGROUND_YELLOW]), m.Paragraph("mid")], style=[m.RESET]), m.Paragraph("top")], style=[m.FOREGROUND_WHITE, m.CENTER])],
+        "unicode": [m.Header("Grüße ✓", [m.Paragraph("héllo wörld", style=[m.FOREGROUND_RED])])],
+        "login_form": [login],
+        "empty": [],
+    }
+
+def element_cases(m):
+    """
+    Elements rendered on their own, below a parent with its own style.
+    """
+    return {
+        "div_in_parent": (m.Div([m.Paragraph("a"), m.Input("i"), m.Hr()], style=[m.FOREGROUND_RED]), 2, [m.BACKGROUND_BLUE]),
+        "div_unstyled_in_parent": (m.Div([m.Paragraph("a"), m.Anchor("b", "/page/b.mu")]), 1, [m.FOREGROUND_GREEN, m.CENTER]),
+        "header_in_parent": (m.Header("H", [m.Paragraph("p"), m.Radio("r", "v")]), 1, [m.CENTER]),
+        "span_in_parent": (m.Span([m.Paragraph("x"), m.Input("i", style=[m.BOLD])], style=[m.CENTER]), 0, [m.FOREGROUND_RED, m.LEFT]),
+        "anchor_in_parent": (m.Anchor("a", "/page/a.mu", style=[m.BOLD]), 0, [m.FOREGROUND_GREEN]),
+    }
+
+GOLDEN = {
+    'paragraph': 'Hello World!',
+    'paragraph_styled': '`c`_`*`!`B00f`Ff00Hello`f`b`!`*`_',
+    'paragraph_markup': 'p<>`x',
+    'paragraphs': 'one\n`rtwo\nthree',
+    'header': '> Title\n',
+    'header_styled': '> `l`F0f0Title\nbody',
+    'headers_nested': '> One\na\n>> Two\nb\n>>> Three\nc',
+    'div': '\na\nb',
+    'div_styled': '`c`B888\na\n-\n> H\nb',
+    'div_indented': '> H\n`F00f\n  a\n  `Ff00\n  b`F00f',
+    'span': 'a`!b`!`[c`/page/c.mu]',
+    'span_styled': 'a`<n`d>`c`Ff00',
+    'input': '`<name`>',
+    'input_options': '`B555`<!12|secret`hunter2>`b',
+    'checkbox': '`< ?|checkbox|1`>\n`< ?|agree|yes|*`>',
+    'radio': '`<^|colour|red`>\n`F00f`<^|colour|blue|*`>`f',
+    'anchor': '`[Home`/page/index.mu]\n`Ffa5`_`[Styled`/page/x.mu`a=1]`_`f',
+    'br': 'a\n\nb\n',
+    'hr': '-\n-=\n`c`F888--',
+    'inherit_header_div_span': '> `c`B00fH\n`F0f0\n  plain`Ff00`<i`v>`f`l`B00f`<^|r|1`>`l`B00f`[a`/page/a.mu]`l`B00f\n  after`c`B00f\n`!`[b`/page/b.mu]`!`r`B00f',
+    'inherit_same_style': '`Ff00\n`Ff00`<i`>`f\n`Ff00`[a`/page/a.mu]`f',
+    'inherit_nested_divs': '`c`Ffff\n`a\n`Bff0\ndeep\n`*`<^|r|v`>`*`c`Ffff`c`Ffff\nmid`c`Ffff\ntop',
+    'unicode': '> Grüße ✓\n`Ff00héllo wörld`f',
+    'login_form': '> Login Form Example\n`c`B333\n  \n  Username: `B555`<16|name`Anonymous>`b`B333\n  Password: `B555`<16|pass`password123>`b`B333\n  \n  `B555`[   Submit   `None]`b`c`B333\n  ',
+    'empty': '',
+}
+
+GOLDEN_STYLES = {
+    ('none', True): 'T`f`b',
+    ('none', False): 'T',
+    ('empty', True): 'T',
+    ('empty', False): 'T',
+    ('inline', True): '`_`*`!`B00f`Ff00T`f`b`!`*`_',
+    ('inline', False): '`_`*`!`B00f`Ff00T`!`*`_',
+    ('line', True): '`c`aT',
+    ('line', False): '`c`aT',
+    ('mixed', True): '`c`Ff00`!T`!`f',
+    ('mixed', False): '`c`Ff00`!T`!',
+}
+
+GOLDEN_ELEMENTS = {
+    'div_in_parent': '`Ff00\n    a\n    `<i`>`B00f\n-`B00f',
+    'div_unstyled_in_parent': '\n  a\n  `[b`/page/b.mu]`c`F0f0`c`F0f0',
+    'header_in_parent': '>> H\np\n`<^|r|v`>`c',
+    'span_in_parent': 'x`!`<i`>`!`c`Ff00',
+    'anchor_in_parent': '`!`[a`/page/a.mu]`!`F0f0',
+}
+
+def page(name:str) -> Micron:
+    return Micron(page_cases(mu)[name])
+
+@pytest.mark.parametrize("name", GOLDEN)
+def test_render(name):
+    assert page(name).render() == GOLDEN[name]
+
+@pytest.mark.parametrize("name", GOLDEN)
+def test_build(name):
+    assert page(name).build() == (GOLDEN[name] + FOOTER).encode("utf-8")
+
+@pytest.mark.parametrize("name", GOLDEN)
+def test_iter_render(name):
+    assert "".join(page(name).iter_render()) == GOLDEN[name]
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 4096])
+@pytest.mark.parametrize("name", GOLDEN)
+def test_iter_build(name, chunk_size):
+    chunks = list(page(name).iter_build(chunk_size))
+    assert b"".join(chunks) == (GOLDEN[name] + FOOTER).encode("utf-8")
+    assert all(chunks)
+
+@pytest.mark.parametrize("name", GOLDEN)
+def test_compile_without_slots(name):
+    assert page(name).compile().build() == (GOLDEN[name] + FOOTER).encode("utf-8")
+
+@pytest.mark.parametrize("name", GOLDEN_ELEMENTS)
+def test_element_render(name):
+    (element, indent, parent_style) = element_cases(mu)[name]
+    assert element.render(indent, parent_style) == GOLDEN_ELEMENTS[name]
+    assert "".join(element.iter_render(indent, parent_style)) == GOLDEN_ELEMENTS[name]
+
+@pytest.mark.parametrize("key", GOLDEN_STYLES)
+def test_apply_styles(key):
+    (name, reset) = key
+    assert mu.apply_styles("T", STYLES[name], reset) == GOLDEN_STYLES[key]
+
+def test_render_is_repeatable():
+    micron = page("inherit_header_div_span")
+    assert micron.render() == micron.render() == GOLDEN["inherit_header_div_span"]
+
+def slot_cases(values:dict) -> dict:
+    """
+    Pages with slots, filled with values (or their defaults where a value is missing).
+    """
+    slot = lambda name, style=None: mu.Slot(name, values.get(name, f"<{name}>"), style=style)
+    return {
+        "styled_slot_in_styled_div": [mu.Div([slot("name", [mu.FOREGROUND_RED]), mu.Paragraph(" after")], style=[mu.FOREGROUND_GREEN])],
+        "slot_in_styled_div": [mu.Div([slot("name"), mu.Paragraph(" after")], style=[mu.FOREGROUND_GREEN, mu.CENTER])],
+        "slot_same_style_as_div": [mu.Div([slot("name", [mu.FOREGROUND_RED]), mu.Paragraph(" after")], style=[mu.FOREGROUND_RED])],
+        "slots_in_header_and_span": [mu.Header("Hi", [
+            mu.Span([mu.Paragraph("Hello "), slot("name", [mu.BOLD]), mu.Paragraph(", you have "), slot("count", [mu.FOREGROUND_RED]), mu.Paragraph(" messages")], style=[mu.LEFT]),
+            mu.Anchor("Inbox", "/page/inbox.mu"),
+        ], style=[mu.BACKGROUND_BLUE])],
+        "top_level_slot": [slot("name"), mu.Paragraph("after", style=[mu.ITALIC])],
+    }
+
+@pytest.mark.parametrize("name", slot_cases({}))
+def test_compile_matches_render(name):
+    template = Micron(slot_cases({})[name]).compile()
+    values = {key: value for (key, value) in {"name": "Bob `F00f", "count": 3}.items() if key in template.names}
+    assert template.build() == Micron(slot_cases({})[name]).build()
+    assert template.build(**values) == Micron(slot_cases(values)[name]).build()
+
+def test_styled_slot_restores_layout_style():
+    micron = Micron(slot_cases({"name": "Bob"})["styled_slot_in_styled_div"])
+    anchor = Micron([mu.Div([mu.Anchor("Bob", "/page/bob.mu", style=[mu.FOREGROUND_RED]), mu.Paragraph(" after")], style=[mu.FOREGROUND_GREEN])])
+    assert micron.render() == "`F0f0\n`Ff00Bob`f`F0f0\n after"
+    assert anchor.render().endswith("`f`F0f0\n after")
+
+class RenderOnly(mu.Paragraph):
+    def render(self, indent=0, parent_style=()):
+        return "[" + super().render(indent, parent_style) + "]"
+
+class IterRenderOnly(mu.Paragraph):
+    def iter_render(self, indent=0, parent_style=()):
+        yield "{"
+        yield from super().iter_render(indent, parent_style)
+        yield "}"
+
+class InheritedRenderOnly(RenderOnly):
+    pass
+
+def test_render_only_subclass_in_tree():
+    micron = Micron([mu.Div([RenderOnly("new"), InheritedRenderOnly("b", style=[mu.BOLD]), IterRenderOnly("it")])])
+    assert micron.render() == "\n[new]\n[`!b`!]\n{it}"
+    assert RenderOnly("new").render() == "[new]"
+
+def test_style_assigned_after_construction():
+    def tree(style):
+        span = mu.Span([mu.Paragraph("a"), mu.Anchor("b", "/page/b.mu")], style=style)
+        return mu.Div([span, mu.Paragraph("c", style=style)], style=style)
+
+    micron = Micron([tree(None)])
+    div = micron.subnodes[0]
+    for element in (div, div.subnodes[0], div.subnodes[1]):
+        element.style = [mu.BOLD, mu.CENTER]
+    assert div.style == (mu.BOLD, mu.CENTER)
+    assert micron.render() == Micron([tree([mu.BOLD, mu.CENTER])]).render()
+    # Assigned again, the Span's cached combined style follows
+    div.subnodes[0].style = [mu.FOREGROUND_RED]
+    assert micron.render() == Micron([mu.Div([
+        mu.Span([mu.Paragraph("a"), mu.Anchor("b", "/page/b.mu")], style=[mu.FOREGROUND_RED]),
+        mu.Paragraph("c", style=[mu.BOLD, mu.CENTER]),
+    ], style=[mu.BOLD, mu.CENTER])]).render()
+
+def paginate_cases() -> dict:
+    """
+    Pages far larger than the budgets below, each leaf tagged with a number.
+    """
+    counter = iter(range(10**6))
+    leaf = lambda style=None: mu.Paragraph(f"<{next(counter)}> some text", style=style)
+    leaves = lambda count=4: [leaf([mu.BOLD] if i % 3 == 1 else [mu.FOREGROUND_RED, mu.CENTER] if i % 3 == 2 else None) for i in range(count)]
+    def deep(depth):
+        if not depth:
+            return leaves()
+        return [mu.Header(f"Level {depth}", deep(depth - 1) + [mu.Div(leaves(depth + 2), style=[mu.ITALIC])], style=[mu.FOREGROUND_RED]), leaf([mu.RIGHT])]
+    return {
+        "nested": [mu.Header("Top", [mu.Header(f"Sub {i}", [mu.Div([mu.Div(leaves(count), style=[mu.BOLD]) for count in range(1, 12)]), leaf()]) for i in range(2)], style=[mu.FOREGROUND_GREEN])],
+        "styled": [mu.Div([mu.Div(leaves(count), style=[mu.BOLD]), mu.Span(leaves(), style=[mu.RIGHT]), mu.Header("Styled", leaves(count), style=[mu.FOREGROUND_BLUE])], style=[mu.BACKGROUND_BLUE, mu.ITALIC]) for count in range(1, 12)],
+        "deep": [mu.Div(deep(depth), style=[mu.UNDERLINE]) for depth in range(1, 7)],
+    }
+
+@pytest.mark.parametrize("budget", [204, 266, 310, 431])
+@pytest.mark.parametrize("name", paginate_cases())
+def test_paginate_fits_budget(name, budget):
+    micron = Micron(paginate_cases()[name])
+    pages = micron.paginate(budget, "/page/index.mu")
+    assert len(pages) > 1
+    for page in pages:
+        # Only a single leaf too deep to fit even alone may take an oversized page
+        assert len(page) <= budget or len(re.findall(rb"<\d+>", page)) == 1
+    # Every leaf ends up on exactly one page, in order
+    leaves = [number for page in pages for number in re.findall(rb"<(\d+)>", page)]
+    assert leaves == re.findall(rb"<(\d+)>", micron.build())
+
+def test_paginate_navigation_is_unstyled():
+    micron = Micron(paginate_cases()["styled"])
+    for page in micron.paginate(431, "/page/index.mu"):
+        navigation = page.decode("utf-8").split("\n")[-2]
+        assert navigation.startswith("``") and "Page " in navigation
@@ -0,0 +1,32 @@
+"""
+Tests of the delivery pipeline's queue policies.
+"""
+import threading
+from LXMKit.pipeline import DeliveryPipeline
+
+def test_drop_oldest_keeps_stop_sentinel():
+    pipeline = DeliveryPipeline(workers=1, max_queue=2, policy=DeliveryPipeline.DROP_OLDEST)
+    started = threading.Event()
+    release = threading.Event()
+    ran = []
+
+    def blocking():
+        started.set()
+        release.wait(5)
+    pipeline.submit(b"a", blocking)
+    assert started.wait(5)
+
+    stopper = threading.Thread(target=pipeline.stop, daemon=True)
+    stopper.start()
+    # The worker is busy, so the stop sentinel is the only thing queued
+    while pipeline.shards[0].qsize() < 1:
+        pass
+
+    assert pipeline.submit(b"a", lambda: ran.append("kept"))
+    assert not pipeline.submit(b"a", lambda: ran.append("dropped"))
+
+    release.set()
+    stopper.join(5)
+    assert not stopper.is_alive()
+    assert ran == ["kept"]
+    assert pipeline.stats["dropped"] == 1